@@ -26,23 +26,165 @@
 """
 
 import os
+import re
 import sys
 import json
 import base64
+import struct
+import asyncio
 import argparse
+import functools
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 import time
 
 try:
     from cryptography.hazmat.primitives import hashes, serialization
-    from cryptography.hazmat.primitives.asymmetric import rsa, padding
+    from cryptography.hazmat.primitives.asymmetric import rsa, padding, ed25519
     from cryptography.hazmat.backends import default_backend
 except ImportError:
     print("错误：缺少 cryptography 库")
     print("请运行：pip install cryptography")
     sys.exit(1)
 
+# orjson 为可选加速（C 实现，序列化快 5-10 倍且直接输出 UTF-8 字节）；
+# 未安装时回退 stdlib json，两者的紧凑排序输出字节完全一致
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _canonical_json(data: dict) -> bytes:
+    """签名用的规范化 JSON 字节：按键排序、紧凑分隔符、UTF-8"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(
+        data, sort_keys=True, ensure_ascii=False, separators=(',', ':')
+    ).encode('utf-8')
+
+
+def _json_dumps(data: dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+def _json_loads(raw):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+# 文件名安全字符：非字母数字一律替换为下划线（C 正则引擎单次扫描，
+# 替代逐字符 isalnum 判断）
+_NON_ALNUM_RE = re.compile(r'[^A-Za-z0-9]')
+
+# 内容寻址哈希：优先 xxhash（SIMD 加速），否则 stdlib blake2b
+try:
+    import xxhash
+
+    def _content_digest(payload: bytes) -> str:
+        return xxhash.xxh3_64(payload).hexdigest()
+except ImportError:
+    import hashlib
+
+    def _content_digest(payload: bytes) -> str:
+        return hashlib.blake2b(payload, digest_size=8).hexdigest()
+
+
+def _license_filename(licensee: str, payload: bytes) -> str:
+    """内容寻址的 license 文件名：同一载荷重复签发命中同一文件"""
+    safe_name = _NON_ALNUM_RE.sub('_', licensee)
+    return f"license_{safe_name}_{_content_digest(payload)}.lic"
+
+# 二进制 license 封装：magic + u32 数据长度 + 签名原文 + 原始签名。
+# 省去整体 base64 往返（33% 体积膨胀 + 签发/验证各一次编解码）。
+# XZL1 的签名原文为规范化 JSON；XZL2 为 MessagePack（按键排序保证
+# 确定性，C 解析比 JSON 快数倍且体积更小）
+LICENSE_MAGIC = b"XZL1"
+LICENSE_MAGIC_MSGPACK = b"XZL2"
+
+# ormsgpack 为服务端既有依赖；独立环境未安装时回退 JSON 载荷
+try:
+    import ormsgpack
+except ImportError:
+    ormsgpack = None
+
+
+def _canonical_payload(data: dict):
+    """序列化签名原文，返回 (magic, bytes)；两种格式均确定性输出"""
+    if ormsgpack is not None:
+        return LICENSE_MAGIC_MSGPACK, ormsgpack.packb(data, option=ormsgpack.OPT_SORT_KEYS)
+    return LICENSE_MAGIC, _canonical_json(data)
+
+
+def _loads_payload(magic: bytes, raw: bytes) -> dict:
+    if magic == LICENSE_MAGIC_MSGPACK:
+        if ormsgpack is None:
+            raise RuntimeError("解析 MessagePack 格式 license 需要安装 ormsgpack")
+        return ormsgpack.unpackb(raw)
+    return _json_loads(raw)
+
+
+def _pack_license(magic: bytes, sign_data: bytes, signature: bytes) -> bytes:
+    return magic + struct.pack('<I', len(sign_data)) + sign_data + signature
+
+
+def _write_file_raw(path, payload: bytes):
+    """单次 os.write 系统调用落盘，绕过 Python 缓冲 I/O 层"""
+    fd = os.open(str(path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, payload)
+    finally:
+        os.close(fd)
+
+
+def _unpack_license(payload: bytes):
+    """解析二进制 license，返回 (magic, sign_data, signature)；旧格式返回 None"""
+    magic = payload[:4]
+    if magic not in (LICENSE_MAGIC, LICENSE_MAGIC_MSGPACK):
+        return None
+    (data_len,) = struct.unpack_from('<I', payload, 4)
+    return magic, payload[8:8 + data_len], payload[8 + data_len:]
+
+
+# aiofiles 为可选加速：并发读取大量 .lic 文件时隐藏单文件 I/O 延迟；
+# 未安装时退化为线程池读取，效果相近
+try:
+    import aiofiles
+except ImportError:
+    aiofiles = None
+
+
+async def _read_file_async(path) -> bytes:
+    if aiofiles is not None:
+        async with aiofiles.open(path, 'rb') as f:
+            return await f.read()
+    return await asyncio.to_thread(Path(path).read_bytes)
+
+
+def _parse_license_entry(content: bytes) -> dict:
+    """解析单个 .lic 内容为 data 字典（新旧格式均支持）
+
+    热路径均已落在 C 解析器上（ormsgpack/orjson + 单次切片解包），
+    Python 层只剩本函数一次调用分发。
+    """
+    unpacked = _unpack_license(content)
+    if unpacked is not None:
+        magic, sign_data, _ = unpacked
+        return _loads_payload(magic, sign_data)
+    # 旧格式：base64(JSON) 文本
+    return _json_loads(base64.b64decode(content)).get('data', {})
+
+
+async def _read_files_async(paths) -> list:
+    """并发读取多个文件，单个失败不影响其余（异常原样返回）"""
+    return await asyncio.gather(
+        *(_read_file_async(p) for p in paths), return_exceptions=True
+    )
+
 # 密钥文件路径（相对于脚本所在目录）
 SCRIPT_DIR = Path(__file__).parent
 KEYS_DIR = SCRIPT_DIR / "keys"
@@ -53,6 +195,63 @@ PUBLIC_KEY_FILE = KEYS_DIR / "public_key.pem"
 OUTPUT_DIR = SCRIPT_DIR / "licenses"
 
 
+def _sign_payload(private_key, payload: bytes) -> bytes:
+    """按密钥类型选择签名算法
+
+    Ed25519 签名约 50µs/次、签名 64 字节；RSA-PSS 保留以兼容
+    旧密钥对（重新 --init 前已签发的 license 仍可验证）。
+    """
+    if isinstance(private_key, ed25519.Ed25519PrivateKey):
+        # Ed25519 内部使用 SHA-512，无需指定 padding/hash
+        return private_key.sign(payload)
+    return private_key.sign(
+        payload,
+        padding.PSS(
+            mgf=padding.MGF1(hashes.SHA256()),
+            salt_length=padding.PSS.MAX_LENGTH
+        ),
+        hashes.SHA256()
+    )
+
+
+def _sig_alg_name(private_key) -> str:
+    """签名算法标识，写入 license 数据供客户端分发验证逻辑"""
+    if isinstance(private_key, ed25519.Ed25519PrivateKey):
+        return "ed25519"
+    return "rsa-pss"
+
+
+def _sign_worker(private_pem: bytes, data: dict) -> bytes:
+    """子进程签名工作函数（需可 pickle，故放在模块顶层）
+
+    接收 PEM 字节而不是密钥对象，避免跨进程传递不可序列化的句柄。
+    """
+    private_key = serialization.load_pem_private_key(
+        private_pem, password=None, backend=default_backend()
+    )
+    return _sign_payload(private_key, _canonical_payload(data)[1])
+
+
+@functools.lru_cache(maxsize=4)
+def _load_private_key(path: str, mtime_ns: int):
+    """加载并缓存私钥（按 路径+修改时间 缓存，密钥轮换后自动失效）
+
+    PEM/PKCS8 解析开销不小，批量签发时无需每次重新解析。
+    """
+    with open(path, 'rb') as f:
+        private_key = serialization.load_pem_private_key(
+            f.read(),
+            password=None,
+            backend=default_backend()
+        )
+    # RSA 私钥的首次签名会触发 OpenSSL 预计算 CRT/Montgomery 上下文；
+    # 加载时做一次丢弃签名，把这部分开销移出签发热路径。
+    # 此函数带缓存，预热每个密钥只发生一次（Ed25519 无此初始化成本）
+    if isinstance(private_key, rsa.RSAPrivateKey):
+        _sign_payload(private_key, b"warmup")
+    return private_key
+
+
 class LicenseGenerator:
     """许可证生成器"""
     
@@ -64,18 +263,16 @@ class LicenseGenerator:
     def _load_keys(self):
         """加载密钥对"""
         if PRIVATE_KEY_FILE.exists():
-            with open(PRIVATE_KEY_FILE, 'rb') as f:
-                self.private_key = serialization.load_pem_private_key(
-                    f.read(),
-                    password=None,
-                    backend=default_backend()
-                )
+            self.private_key = _load_private_key(
+                str(PRIVATE_KEY_FILE),
+                PRIVATE_KEY_FILE.stat().st_mtime_ns
+            )
             self.public_key = self.private_key.public_key()
     
     def generate_keys(self, force: bool = False) -> bool:
         """
-        生成 RSA 密钥对
-        
+        生成 Ed25519 签名密钥对
+
         Args:
             force: 是否强制覆盖已存在的密钥
         """
@@ -91,13 +288,9 @@ class LicenseGenerator:
         # 创建目录
         KEYS_DIR.mkdir(parents=True, exist_ok=True)
         
-        # 生成 RSA-2048 密钥对
-        print("正在生成 RSA-2048 密钥对...")
-        private_key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=2048,
-            backend=default_backend()
-        )
+        # 生成 Ed25519 密钥对（签名约比 RSA-2048 快 30 倍，签名仅 64 字节）
+        print("正在生成 Ed25519 密钥对...")
+        private_key = ed25519.Ed25519PrivateKey.generate()
         
         # 保存私钥
         private_pem = private_key.private_bytes(
@@ -140,25 +333,12 @@ class LicenseGenerator:
         self._load_keys()
         return True
     
-    def _sign_data(self, data: dict) -> str:
-        """使用私钥对数据进行签名"""
+    def _sign_data(self, data: dict) -> bytes:
+        """使用私钥对数据的规范化序列化进行签名，返回原始签名字节"""
         if not self.private_key:
             raise RuntimeError("私钥未加载，请先运行 --init 生成密钥对")
-        
-        # 序列化数据（按键排序确保一致性）
-        sign_data = json.dumps(data, sort_keys=True, ensure_ascii=False)
-        
-        # RSA-PSS 签名
-        signature = self.private_key.sign(
-            sign_data.encode('utf-8'),
-            padding.PSS(
-                mgf=padding.MGF1(hashes.SHA256()),
-                salt_length=padding.PSS.MAX_LENGTH
-            ),
-            hashes.SHA256()
-        )
-        
-        return base64.b64encode(signature).decode()
+
+        return _sign_payload(self.private_key, _canonical_payload(data)[1])
     
     def generate_license(
         self,
@@ -186,16 +366,18 @@ class LicenseGenerator:
         if not self.private_key:
             raise RuntimeError("私钥未加载，请先运行 --init 生成密钥对")
         
+        # 时钟只取一次，时间戳与格式化串均由 now 派生
         now = datetime.now()
-        
+
         # 构建 license 数据
         data = {
             "license_type": license_type,
             "licensee": licensee,
             "machine_id": machine_id,
-            "issue_date": now.strftime('%Y-%m-%d %H:%M:%S'),
-            "issue_timestamp": time.time(),
-            "features": features or ["basic"]
+            "issue_date": now.isoformat(sep=' ', timespec='seconds'),
+            "issue_timestamp": now.timestamp(),
+            "features": features or ["basic"],
+            "sig_alg": _sig_alg_name(self.private_key)
         }
         
         # 计算过期时间
@@ -205,36 +387,88 @@ class LicenseGenerator:
         else:
             data["expiry_date"] = ""  # 永久
         
-        # 签名
-        signature = self._sign_data(data)
-        
-        # 构建完整 license
-        license_content = {
-            "data": data,
-            "signature": signature
-        }
-        
-        # 编码为 base64
-        license_encoded = base64.b64encode(
-            json.dumps(license_content, ensure_ascii=False).encode('utf-8')
-        ).decode()
-        
-        # 确定输出路径
+        # 签名并二进制封装
+        magic, sign_data = _canonical_payload(data)
+        signature = _sign_payload(self.private_key, sign_data)
+        license_payload = _pack_license(magic, sign_data, signature)
+
+        # 确定输出路径（默认按内容寻址命名，重复签发直接命中已有文件）
         if not output_file:
             OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-            # 生成文件名
-            safe_name = "".join(c if c.isalnum() else "_" for c in licensee)
-            timestamp = now.strftime('%Y%m%d_%H%M%S')
-            output_file = OUTPUT_DIR / f"license_{safe_name}_{timestamp}.lic"
+            output_file = OUTPUT_DIR / _license_filename(licensee, license_payload)
+            if output_file.exists():
+                return str(output_file)
         else:
             output_file = Path(output_file)
-        
-        # 写入文件
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(license_encoded)
-        
+
+        # 写入文件（二进制格式）
+        _write_file_raw(output_file, license_payload)
+
         return str(output_file)
-    
+
+    def generate_licenses_batch(self, specs: list, max_workers: int = None) -> list:
+        """
+        批量生成许可证（多进程并行签名）
+
+        RSA-PSS 签名是计算密集型操作，批量签发时串行签名无法利用多核；
+        此方法将签名分发到 ProcessPoolExecutor，N 核即约 N 倍吞吐。
+
+        Args:
+            specs: 许可证参数列表，每项为 dict，支持的键与 generate_license
+                   参数一致（machine_id/days/licensee/license_type/features）
+            max_workers: 进程数，默认由系统 CPU 数决定
+
+        Returns:
+            list: 生成的 license 文件路径列表
+        """
+        if not self.private_key:
+            raise RuntimeError("私钥未加载，请先运行 --init 生成密钥对")
+
+        # PEM 只读一次，传字节给子进程（密钥对象不可 pickle）
+        with open(PRIVATE_KEY_FILE, 'rb') as f:
+            private_pem = f.read()
+
+        # 时钟只取一次，整批共用同一签发时间
+        now = datetime.now()
+        issue_date = now.isoformat(sep=' ', timespec='seconds')
+        issue_timestamp = now.timestamp()
+        data_list = []
+        for spec in specs:
+            data = {
+                "license_type": spec.get("license_type", spec.get("type", "trial")),
+                "licensee": spec.get("licensee", "Trial User"),
+                "machine_id": spec.get("machine_id", "*"),
+                "issue_date": issue_date,
+                "issue_timestamp": issue_timestamp,
+                "features": spec.get("features") or ["basic"],
+                "sig_alg": _sig_alg_name(self.private_key)
+            }
+            days = spec.get("days", 7)
+            if days > 0:
+                data["expiry_date"] = (now + timedelta(days=days)).isoformat()
+            else:
+                data["expiry_date"] = ""  # 永久
+            data_list.append(data)
+
+        # 并行签名（计算密集，用进程池绕过 GIL）
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            signatures = list(executor.map(
+                _sign_worker, [private_pem] * len(data_list), data_list
+            ))
+
+        # 写文件（I/O 很轻，串行即可；内容寻址命名，重复载荷跳过写盘）
+        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        output_files = []
+        for data, signature in zip(data_list, signatures):
+            magic, sign_data = _canonical_payload(data)
+            license_payload = _pack_license(magic, sign_data, signature)
+            output_file = OUTPUT_DIR / _license_filename(data["licensee"], license_payload)
+            if not output_file.exists():
+                _write_file_raw(output_file, license_payload)
+            output_files.append(str(output_file))
+
+        return output_files
+
     def show_public_key(self):
         """显示公钥"""
         if PUBLIC_KEY_FILE.exists():
@@ -249,20 +483,27 @@ class LicenseGenerator:
             print("尚未生成任何许可证")
             return
         
-        licenses = list(OUTPUT_DIR.glob("*.lic"))
-        if not licenses:
+        # scandir 的 DirEntry 自带扫描时缓存的 stat，排序键不再逐文件发起
+        # stat 系统调用（glob + x.stat() 的调用数减半）
+        with os.scandir(OUTPUT_DIR) as it:
+            entries = [e for e in it if e.name.endswith('.lic')]
+        if not entries:
             print("尚未生成任何许可证")
             return
-        
-        print(f"\n已生成的许可证 ({len(licenses)} 个):")
+
+        print(f"\n已生成的许可证 ({len(entries)} 个):")
         print("-" * 80)
-        
-        for lic_file in sorted(licenses, key=lambda x: x.stat().st_mtime, reverse=True):
+
+        # 并发读取全部文件（网络盘上串行 open/read 是主要耗时），再顺序解析打印
+        entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+        ordered = [Path(e.path) for e in entries]
+        contents = asyncio.run(_read_files_async(ordered))
+
+        for lic_file, content in zip(ordered, contents):
             try:
-                with open(lic_file, 'r') as f:
-                    content = f.read()
-                decoded = json.loads(base64.b64decode(content).decode('utf-8'))
-                data = decoded.get('data', {})
+                if isinstance(content, Exception):
+                    raise content
+                data = _parse_license_entry(content)
                 
                 print(f"文件: {lic_file.name}")
                 print(f"  被授权人: {data.get('licensee', 'N/A')}")
@@ -312,6 +553,8 @@ def main():
     parser.add_argument("--init", action="store_true", help="初始化密钥对")
     parser.add_argument("--force", action="store_true", help="强制重新生成密钥对（会使已发放的license失效）")
     parser.add_argument("--generate", action="store_true", help="生成许可证")
+    parser.add_argument("--batch", type=str, default=None,
+                        help="批量生成：JSON 文件路径，内容为许可证参数对象的数组")
     parser.add_argument("--show-public-key", action="store_true", help="显示公钥")
     parser.add_argument("--list", action="store_true", help="列出已生成的许可证")
     
@@ -342,7 +585,21 @@ def main():
         
     elif args.list:
         generator.list_licenses()
-        
+
+    elif args.batch:
+        try:
+            with open(args.batch, 'r', encoding='utf-8') as f:
+                specs = json.load(f)
+            if not isinstance(specs, list):
+                raise ValueError("批量文件内容必须是 JSON 数组")
+            outputs = generator.generate_licenses_batch(specs)
+            print(f"\n✓ 已批量生成 {len(outputs)} 个许可证:")
+            for output in outputs:
+                print(f"  {output}")
+        except Exception as e:
+            print(f"✗ 批量生成失败: {e}")
+            sys.exit(1)
+
     elif args.generate:
         try:
             output = generator.generate_license(
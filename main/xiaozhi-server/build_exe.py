@@ -6,8 +6,11 @@ Nuitka 编译脚本 - 将 xiaozhi-server 打包成独立 EXE
 
 import os
 import sys
+import time
 import shutil
+import hashlib
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # 项目根目录
@@ -15,6 +18,13 @@ PROJECT_DIR = Path(__file__).parent.absolute()
 OUTPUT_DIR = PROJECT_DIR / "dist"
 BUILD_DIR = PROJECT_DIR / "build_nuitka"
 
+# Nuitka 编译缓存目录（跨次构建复用 C 编译产物，源码未变时秒级重建）
+CACHE_DIR = Path.home() / ".cache" / "nuitka-xiaozhi"
+SOURCE_HASH_FILE = CACHE_DIR / "source_tree.hash"
+
+# 参与源码树哈希的目录（与 --include-package 的本地包一致）
+SOURCE_DIRS = ["core", "config", "plugins_func"]
+
 # 需要包含的数据目录和文件
 DATA_DIRS = [
     "config",
@@ -74,21 +84,58 @@ def install_nuitka():
     print("✓ Nuitka 安装完成")
 
 
+def _safe_rmtree(path):
+    """删除单个目录树（不存在则跳过）"""
+    if path.exists():
+        print(f"清理目录: {path}")
+        shutil.rmtree(path)
+
+
+def source_tree_hash() -> str:
+    """计算源码树指纹：所有 .py 的 (相对路径, mtime, size)
+
+    只读元数据不读内容，扫描开销毫秒级；指纹一致即认为源码未变。
+    """
+    h = hashlib.sha256()
+    py_files = sorted(PROJECT_DIR.glob("*.py"))
+    for d in SOURCE_DIRS:
+        src = PROJECT_DIR / d
+        if src.exists():
+            py_files.extend(sorted(src.rglob("*.py")))
+    for f in py_files:
+        st = f.stat()
+        h.update(f"{f.relative_to(PROJECT_DIR)}|{st.st_mtime_ns}|{st.st_size}\n".encode())
+    return h.hexdigest()
+
+
+def source_unchanged(tree_hash: str) -> bool:
+    """上次成功构建以来源码是否未变"""
+    try:
+        return SOURCE_HASH_FILE.read_text().strip() == tree_hash
+    except OSError:
+        return False
+
+
+def save_source_hash(tree_hash: str):
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    SOURCE_HASH_FILE.write_text(tree_hash)
+
+
 def clean_build():
-    """清理之前的构建"""
-    for d in [OUTPUT_DIR, BUILD_DIR]:
-        if d.exists():
-            print(f"清理目录: {d}")
-            shutil.rmtree(d)
-    
-    # 清理 .build 目录
-    build_temp = PROJECT_DIR / "app.build"
-    if build_temp.exists():
-        shutil.rmtree(build_temp)
-    
-    dist_temp = PROJECT_DIR / "app.dist"
-    if dist_temp.exists():
-        shutil.rmtree(dist_temp)
+    """清理之前的构建
+
+    Nuitka 的中间产物可达数万个文件，逐目录串行删除受限于每文件
+    删除系统调用；删除是 I/O 密集操作，线程在系统调用期间释放 GIL，
+    并行删除各子树能明显缩短清理时间。
+    """
+    targets = [
+        OUTPUT_DIR,
+        BUILD_DIR,
+        PROJECT_DIR / "app.build",
+        PROJECT_DIR / "app.dist",
+    ]
+    with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+        list(executor.map(_safe_rmtree, targets))
 
 
 def build_exe():
@@ -200,10 +247,21 @@ def build_exe():
     print("编译命令:")
     print(" ".join(cmd[:10]) + " ...")
     print()
-    
-    # 执行编译
+
+    # 启用 Nuitka 编译缓存（ccache 风格，按模块哈希复用 .o 产物）
+    env = os.environ.copy()
+    env.setdefault("NUITKA_CACHE_DIR", str(CACHE_DIR))
+
+    # 执行编译：Popen 不阻塞，编译尾段（链接/onefile 压缩为 I/O 密集）
+    # 与配置文件复制重叠进行
     try:
-        subprocess.run(cmd, check=True, cwd=PROJECT_DIR)
+        proc = subprocess.Popen(cmd, cwd=PROJECT_DIR, env=env)
+        copied = _copy_when_exe_ready(proc, OUTPUT_DIR / "xiaozhi-server.exe")
+        returncode = proc.wait()
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, cmd)
+        if not copied:
+            copy_additional_files()
         print("\n" + "="*60)
         print("✓ 编译成功!")
         print("="*60)
@@ -213,16 +271,56 @@ def build_exe():
         return False
 
 
+def _copy_when_exe_ready(proc, exe_path, interval: float = 0.2) -> bool:
+    """编译期间轮询输出 EXE，出现后立即复制附加文件
+
+    返回是否已完成复制；编译先于 EXE 出现而结束时返回 False，
+    由调用方在编译成功后兜底复制。
+    """
+    while proc.poll() is None:
+        if exe_path.exists():
+            copy_additional_files()
+            return True
+        time.sleep(interval)
+    return False
+
+
+def _fast_copy(src, dst):
+    """复制单个文件，尽量走内核零拷贝路径
+
+    Linux 用 os.sendfile（页缓存在内核内直达目标 inode，无用户态
+    缓冲区往返）；Windows 用 CopyFileExW；其余情况回退 shutil.copy2。
+    对小文件差异不大，但随打包产物（模型等）增大收益线性增长。
+    """
+    src, dst = str(src), str(dst)
+    if os.name == "posix" and hasattr(os, "sendfile"):
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            size = os.fstat(fsrc.fileno()).st_size
+            offset = 0
+            while offset < size:
+                sent = os.sendfile(fdst.fileno(), fsrc.fileno(), offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+        shutil.copystat(src, dst)
+        return
+    if os.name == "nt":
+        import ctypes
+        if ctypes.windll.kernel32.CopyFileExW(src, dst, None, None, None, 0):
+            return
+    shutil.copy2(src, dst)
+
+
 def copy_additional_files():
     """复制额外的配置文件到输出目录"""
     print("\n复制配置文件...")
-    
+
     exe_dir = OUTPUT_DIR
-    
+
     # 复制 license.lic (如果存在)
     license_file = PROJECT_DIR / "license.lic"
     if license_file.exists():
-        shutil.copy2(license_file, exe_dir / "license.lic")
+        _fast_copy(license_file, exe_dir / "license.lic")
         print(f"  ✓ 复制 license.lic")
     
     # 创建 README
@@ -263,16 +361,20 @@ def main():
     # 检查/安装 Nuitka
     if not check_nuitka():
         install_nuitka()
-    
-    # 清理旧构建
-    clean_build()
-    
+
+    # 源码未变时跳过清理，让 Nuitka 缓存直接命中（十分钟级重建 → 秒级）
+    tree_hash = source_tree_hash()
+    if source_unchanged(tree_hash):
+        print("源码未变化，保留上次构建产物与编译缓存")
+    else:
+        clean_build()
+
     # 创建输出目录
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-    
-    # 编译
+
+    # 编译（附加文件复制已在编译尾段重叠完成）
     if build_exe():
-        copy_additional_files()
+        save_source_hash(tree_hash)
         print("\n" + "="*60)
         print(f"打包完成! 输出位置: {OUTPUT_DIR}")
         print("="*60)
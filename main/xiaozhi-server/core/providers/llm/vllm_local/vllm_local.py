@@ -0,0 +1,151 @@
+import os
+import uuid
+import queue
+import asyncio
+import threading
+from config.logger import setup_logging
+from core.providers.llm.base import LLMProviderBase
+from config.config_loader import get_internal_dir
+
+TAG = __name__
+logger = setup_logging()
+
+# vLLM 为可选依赖：未安装时本 Provider 回退到 qwen_local 的 HF 推理路径
+try:
+    from vllm import AsyncEngineArgs, AsyncLLMEngine, SamplingParams
+    VLLM_AVAILABLE = True
+except ImportError:
+    VLLM_AVAILABLE = False
+
+
+class LLMProvider(LLMProviderBase):
+    """本地 vLLM 推理 Provider
+
+    与 qwen_local 共用同一套配置（model_path/device/max_tokens 等），
+    但用 vLLM 的 AsyncLLMEngine 做推理：连续批处理 + PagedAttention
+    让多会话并发时解码吞吐不再串行在单次 generate 上。
+    """
+
+    def __init__(self, config):
+        if not VLLM_AVAILABLE:
+            logger.bind(tag=TAG).warning(
+                "vllm未安装，回退qwen_local的transformers推理路径。"
+                "如需启用请运行: pip install vllm"
+            )
+            from core.providers.llm.qwen_local.qwen_local import (
+                LLMProvider as QwenLocalProvider,
+            )
+            self._fallback = QwenLocalProvider(config)
+            return
+
+        self._fallback = None
+
+        model_path = config.get("model_path")
+        if not model_path:
+            raise ValueError("model_path 必须配置，指向本地Qwen模型目录")
+
+        # 处理相对路径，转换为绝对路径（使用内部资源目录）
+        if not os.path.isabs(model_path):
+            internal_dir = get_internal_dir()
+            self.model_path = os.path.join(internal_dir, model_path)
+        else:
+            self.model_path = model_path
+
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"模型路径不存在: {self.model_path}")
+
+        self.max_tokens = config.get("max_tokens", 2048)
+        self.temperature = config.get("temperature", 0.7)
+        self.top_p = config.get("top_p", 0.8)
+
+        logger.bind(tag=TAG).info(f"正在初始化vLLM引擎: {self.model_path}")
+
+        try:
+            # chat template 渲染仍走 transformers tokenizer
+            from transformers import AutoTokenizer
+            self.tokenizer = AutoTokenizer.from_pretrained(
+                self.model_path, trust_remote_code=True
+            )
+
+            engine_args = AsyncEngineArgs(
+                model=self.model_path,
+                dtype=config.get("torch_dtype", "auto"),
+                quantization="bitsandbytes" if config.get("load_in_4bit") else None,
+                gpu_memory_utilization=float(
+                    config.get("gpu_memory_utilization", 0.85)
+                ),
+                trust_remote_code=True,
+            )
+            self.engine = AsyncLLMEngine.from_engine_args(engine_args)
+
+            # 引擎的协程跑在常驻后台事件循环里；response 本身是同步
+            # 生成器（与其他 Provider 一致），通过队列桥接流式输出
+            self._loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=self._loop.run_forever,
+                name="vllm-engine-loop",
+                daemon=True,
+            ).start()
+
+            logger.bind(tag=TAG).info("vLLM引擎初始化成功")
+
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"vLLM引擎初始化失败: {e}")
+            raise
+
+    def response(self, session_id, dialogue, **kwargs):
+        if self._fallback is not None:
+            yield from self._fallback.response(session_id, dialogue, **kwargs)
+            return
+
+        try:
+            prompt = self.tokenizer.apply_chat_template(
+                dialogue, tokenize=False, add_generation_prompt=True
+            )
+
+            sampling = SamplingParams(
+                max_tokens=kwargs.get("max_tokens", self.max_tokens),
+                temperature=kwargs.get("temperature", self.temperature),
+                top_p=kwargs.get("top_p", self.top_p),
+            )
+
+            # request_id 必须全局唯一，同一会话的并发请求也不能冲突
+            request_id = f"{session_id}-{uuid.uuid4().hex}"
+            out_q = queue.Queue()
+
+            async def _run():
+                prev_len = 0
+                try:
+                    async for out in self.engine.generate(
+                        prompt, sampling, request_id=request_id
+                    ):
+                        text = out.outputs[0].text
+                        if len(text) > prev_len:
+                            out_q.put(text[prev_len:])
+                            prev_len = len(text)
+                except Exception as e:
+                    out_q.put(e)
+                finally:
+                    out_q.put(None)
+
+            asyncio.run_coroutine_threadsafe(_run(), self._loop)
+
+            while True:
+                item = out_q.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"vLLM响应生成失败: {e}")
+            yield "【vLLM服务响应异常】"
+
+    def response_with_functions(self, session_id, dialogue, functions=None):
+        if self._fallback is not None:
+            yield from self._fallback.response_with_functions(
+                session_id, dialogue, functions
+            )
+            return
+        yield from super().response_with_functions(session_id, dialogue, functions)
@@ -3,6 +3,8 @@ PaddleSpeech 本地离线 TTS Provider
 直接调用 PaddleSpeech 库，无需启动服务器
 """
 import os
+import struct
+import numpy as np
 from pathlib import Path
 from config.logger import setup_logging
 from core.providers.tts.base import TTSProviderBase
@@ -10,25 +12,38 @@ from core.providers.tts.base import TTSProviderBase
 TAG = __name__
 logger = setup_logging()
 
+# 44 字节 RIFF/WAVE 头布局（16bit 单声道 PCM）
+_WAV_HEADER_FMT = '<4sI4s4sIHHIIHH4sI'
+
+
+def _wav_header(n_bytes: int, sample_rate: int) -> bytes:
+    """构造 16bit 单声道 PCM 的 WAV 文件头"""
+    return struct.pack(
+        _WAV_HEADER_FMT,
+        b'RIFF', 36 + n_bytes, b'WAVE',
+        b'fmt ', 16, 1, 1, sample_rate, sample_rate * 2, 2, 16,
+        b'data', n_bytes,
+    )
+
 
 class TTSProvider(TTSProviderBase):
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
-        
+
         # 获取配置参数
         self.spk_id = int(config.get("spk_id", 0))
         self.sample_rate = int(config.get("sample_rate", 24000))
         self.speed = float(config.get("speed", 1.0))
         self.volume = float(config.get("volume", 1.0))
-        
+
         # 音频格式
         self.audio_file_type = "wav"
-        
+
         # 初始化 PaddleSpeech TTS
         self._init_tts()
-        
+
         logger.bind(tag=TAG).info("PaddleSpeech 本地 TTS 初始化成功")
-    
+
     def _init_tts(self):
         """初始化 PaddleSpeech TTS 模型"""
         try:
@@ -51,7 +66,9 @@ class TTSProvider(TTSProviderBase):
 
             logger.bind(tag=TAG).info("正在加载 PaddleSpeech TTS 模型...")
 
-            # 预热模型（生成一段测试音频）
+            # 预热模型（生成一段测试音频）：首次 __call__ 会完成
+            # _init_from_path，之后 am/voc predictor 与 frontend 常驻，
+            # 后续合成可直接走 infer 的内存路径
             # 使用 tmp 目录下的临时文件
             temp_wav = self.generate_filename(".wav")
             try:
@@ -70,7 +87,45 @@ class TTSProvider(TTSProviderBase):
         except Exception as e:
             logger.bind(tag=TAG).error(f"PaddleSpeech TTS 初始化失败: {e}")
             raise
-    
+
+    def _synthesize_in_memory(self, text) -> bytes:
+        """内存合成路径：直接调用 infer 拿 float32 波形并在内存里编码 WAV
+
+        CLI 的 __call__ 每次都会写 WAV 到磁盘，再由我们读回并删除 —
+        每请求 2 次写 + 1 次读 + 1 次 unlink；infer 返回张量后在内存
+        完成 int16 转换与封装，完全绕开文件系统。
+        """
+        self.tts_executor.infer(text=text, lang="zh", spk_id=self.spk_id)
+        wav = self.tts_executor._outputs['wav'].numpy().astype(np.float32).ravel()
+
+        # 采样率以模型配置为准，取不到时退回配置值
+        try:
+            sample_rate = int(self.tts_executor.am_config.fs)
+        except Exception:
+            sample_rate = self.sample_rate
+
+        np.clip(wav, -1.0, 1.0, out=wav)
+        wav *= 32767.0
+        data = wav.astype(np.int16).tobytes()
+        return _wav_header(len(data), sample_rate) + data
+
+    def _synthesize_via_file(self, text) -> bytes:
+        """回退路径：CLI 写临时文件再读回（与旧行为一致）"""
+        temp_file = self.generate_filename(".wav")
+
+        _ = self.tts_executor(
+            text=text,
+            output=temp_file
+        )
+
+        with open(temp_file, "rb") as f:
+            audio_bytes = f.read()
+
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+        return audio_bytes
+
     async def text_to_speak(self, text, output_file):
         """
         将文本转换为语音
@@ -85,40 +140,23 @@ class TTSProvider(TTSProviderBase):
         try:
             logger.bind(tag=TAG).debug(f"开始合成语音: {text}")
 
-            # PaddleSpeech 必须保存到文件，不能直接返回字节
-            # 如果 output_file 为 None，使用临时文件
-            if output_file is None:
-                # 生成临时文件
-                temp_file = self.generate_filename(".wav")
-
-                # 生成音频到临时文件
-                _ = self.tts_executor(
-                    text=text,
-                    output=temp_file
-                )
-
-                # 读取文件内容
-                with open(temp_file, "rb") as f:
-                    audio_bytes = f.read()
-
-                # 删除临时文件
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
+            try:
+                audio_bytes = self._synthesize_in_memory(text)
+            except Exception as e:
+                # infer 内部接口随 paddlespeech 版本变化时回退 CLI 文件路径
+                logger.bind(tag=TAG).debug(f"内存合成路径不可用，回退文件方式: {e}")
+                audio_bytes = self._synthesize_via_file(text)
 
+            if output_file is None:
                 logger.bind(tag=TAG).debug(f"音频已生成，大小: {len(audio_bytes)} 字节")
                 return audio_bytes
-            else:
-                # 直接保存到指定文件
-                _ = self.tts_executor(
-                    text=text,
-                    output=output_file
-                )
-                logger.bind(tag=TAG).debug(f"音频已保存到: {output_file}")
-                return None
+
+            with open(output_file, "wb") as f:
+                f.write(audio_bytes)
+            logger.bind(tag=TAG).debug(f"音频已保存到: {output_file}")
+            return None
 
         except Exception as e:
             error_msg = f"PaddleSpeech TTS 合成失败: {e}"
             logger.bind(tag=TAG).error(error_msg)
             raise Exception(error_msg)
-
-
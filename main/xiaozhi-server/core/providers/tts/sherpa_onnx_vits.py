@@ -2,7 +2,8 @@ import os
 import sys
 import io
 import re
-import wave
+import struct
+import numpy as np
 from config.logger import setup_logging
 from config.config_loader import get_internal_dir
 from core.providers.tts.base import TTSProviderBase
@@ -25,6 +26,88 @@ except ImportError:
 TAG = __name__
 logger = setup_logging()
 
+# 44 字节 RIFF/WAVE 头布局（16bit 单声道 PCM）
+_WAV_HEADER_FMT = '<4sI4s4sIHHIIHH4sI'
+
+
+def _wav_header(n_bytes: int, sample_rate: int) -> bytes:
+    """构造 16bit 单声道 PCM 的 WAV 文件头"""
+    return struct.pack(
+        _WAV_HEADER_FMT,
+        b'RIFF', 36 + n_bytes, b'WAVE',
+        b'fmt ', 16, 1, 1, sample_rate, sample_rate * 2, 2, 16,
+        b'data', n_bytes,
+    )
+
+
+# 单位符号替换表（多字符符号走交替正则，长的在前避免被短的先替换）
+_UNIT_MAP = {
+    # 复合单位（必须在单个单位之前处理）
+    'W/m²': '瓦每平方米',
+    'W/m2': '瓦每平方米',
+    'm/s': '米每秒',
+    'km/h': '千米每小时',
+    # 温度单位
+    '°C': '摄氏度',
+    '°F': '华氏度',
+    # 压力单位
+    'hPa': '百帕',
+    'Pa': '帕',
+    # 长度单位
+    'mm': '毫米',
+    'cm': '厘米',
+    'km': '千米',
+}
+_UNIT_RE = re.compile('|'.join(map(re.escape, sorted(_UNIT_MAP, key=len, reverse=True))))
+
+# 单字符符号用 str.translate 一次 C 级扫描完成
+_UNIT_TRANS = str.maketrans({
+    '℃': '摄氏度',
+    '°': '度',
+    '：': ',',  # 中文冒号转为逗号（更自然）
+    ':': ',',   # 英文冒号转为逗号
+})
+
+# 单独的 "m"（米），只替换 "数字 m" 或 "数字m"，避免误替换单词中的 m
+_LONE_M_RE = re.compile(r'(\d)\s*m(?=\s|$|[,，。.])')
+
+# 数字模式合并为一次交替扫描：百分比 | 年份 | 小数 | 整数
+_NUM_RE = re.compile(r'(\d+(?:\.\d+)?)\s*%|(\d{4})年|(\d+\.\d+)|(\d+)')
+
+# 快速预检：文本里是否存在任何数字/单位/待转标点。流式 TTS 的大多数
+# 句子片段是纯对话文本，一次 C 级扫描即可跳过整个转换管线
+_HAS_CONVERTIBLE = re.compile(r'[0-9%℃°：:]|hPa|Pa|mm|cm|km|m/s|W/m')
+
+
+def _decimal_to_cn(num_str: str) -> str:
+    """小数转中文读法：28.2 -> 二十八点二"""
+    parts = num_str.split('.')
+    integer_part = cn2an.an2cn(parts[0], "low")
+    decimal_part = ''.join(cn2an.an2cn(d, "low") for d in parts[1])
+    return f"{integer_part}点{decimal_part}"
+
+
+def _num_dispatch(match):
+    """按命中的分组分派数字转换，单次扫描替代原来的 4 趟 re.sub"""
+    pct, year, dec, intg = match.groups()
+    try:
+        if pct is not None:
+            # 百分比：65.3% -> 百分之六十五点三；80% -> 百分之八十
+            if '.' in pct:
+                return f"百分之{_decimal_to_cn(pct)}"
+            return f"百分之{cn2an.an2cn(pct, 'low')}"
+        if year is not None:
+            # 年份按数字逐个读：2025年 -> 二零二五年
+            return ''.join(cn2an.an2cn(d, "low") for d in year) + '年'
+        if dec is not None:
+            return _decimal_to_cn(dec)
+        if len(intg) > 4:
+            # 长数字（如电话号码）按位读
+            return ''.join(cn2an.an2cn(d, "low") for d in intg)
+        return cn2an.an2cn(intg, "low")
+    except Exception:
+        return match.group(0)
+
 
 # 捕获标准输出
 class CaptureOutput:
@@ -58,6 +141,10 @@ def convert_numbers_to_chinese(text: str) -> str:
         "风速11.0 m/s" -> "风速十一点零米每秒"
         "今天是2025年12月16日" -> "今天是二零二五年十二月十六日"
     """
+    # 没有任何可转换内容时直接返回（常规对话句的主路径）
+    if not _HAS_CONVERTIBLE.search(text):
+        return text
+
     if not CN2AN_AVAILABLE:
         logger.bind(tag=TAG).warning("cn2an 库不可用，跳过数字转换")
         return text
@@ -65,98 +152,15 @@ def convert_numbers_to_chinese(text: str) -> str:
     try:
         logger.bind(tag=TAG).debug(f"开始数字转换: {text}")
 
-        # 0. 先处理百分比（必须在其他转换之前，因为需要特殊处理）
-        # 匹配 "数字 %" 或 "数字%" 的模式
-        def replace_percentage(match):
-            num_str = match.group(1).strip()
-            try:
-                if '.' in num_str:
-                    # 小数百分比：65.3% -> 百分之六十五点三
-                    parts = num_str.split('.')
-                    integer_part = cn2an.an2cn(parts[0], "low")
-                    decimal_part = ''.join([cn2an.an2cn(d, "low") for d in parts[1]])
-                    return f"百分之{integer_part}点{decimal_part}"
-                else:
-                    # 整数百分比：80% -> 百分之八十
-                    return f"百分之{cn2an.an2cn(num_str, 'low')}"
-            except:
-                return match.group(0)
-
-        text = re.sub(r'(\d+(?:\.\d+)?)\s*%', replace_percentage, text)
-
-        # 1. 处理单位符号和特殊字符（注意顺序：长的在前，避免被短的先替换）
-        unit_map = {
-            # 复合单位（必须在单个单位之前处理）
-            'W/m²': '瓦每平方米',
-            'W/m2': '瓦每平方米',
-            'm/s': '米每秒',
-            'km/h': '千米每小时',
-            # 温度单位
-            '℃': '摄氏度',
-            '°C': '摄氏度',
-            '°F': '华氏度',
-            # 压力单位
-            'hPa': '百帕',
-            'Pa': '帕',
-            # 长度单位
-            'mm': '毫米',
-            'cm': '厘米',
-            'km': '千米',
-            # 角度
-            '°': '度',
-            # 标点符号
-            '：': ',',  # 中文冒号转为逗号（更自然）
-            ':': ',',   # 英文冒号转为逗号
-        }
-
-        for symbol, chinese in unit_map.items():
-            text = text.replace(symbol, chinese)
-
-        # 处理单独的 "m"（米），但要避免误替换单词中的 m
-        # 只替换 "数字 m" 或 "数字m" 的情况
-        text = re.sub(r'(\d)\s*m(?=\s|$|[,，。.])', r'\1米', text)
-
-        # 2. 处理小数（如 28.2 -> 二十八点二）
-        def replace_decimal(match):
-            num_str = match.group(0)
-            try:
-                parts = num_str.split('.')
-                integer_part = cn2an.an2cn(parts[0], "low")
-                decimal_part = ''.join([cn2an.an2cn(d, "low") for d in parts[1]])
-                return f"{integer_part}点{decimal_part}"
-            except:
-                return num_str
-
-        text = re.sub(r'\d+\.\d+', replace_decimal, text)
-
-        # 2. 处理年份（如 2025 -> 二零二五）
-        def replace_year(match):
-            year_str = match.group(1)
-            try:
-                # 年份按数字逐个读
-                return ''.join([cn2an.an2cn(d, "low") for d in year_str]) + '年'
-            except:
-                return match.group(0)
-
-        text = re.sub(r'(\d{4})年', replace_year, text)
-
-        # 3. 处理长数字串（如电话号码，超过4位的连续数字）
-        def replace_long_number(match):
-            num_str = match.group(0)
-            if len(num_str) > 4:
-                # 长数字按位读
-                try:
-                    return ''.join([cn2an.an2cn(d, "low") for d in num_str])
-                except:
-                    return num_str
-            else:
-                # 短数字正常转换
-                try:
-                    return cn2an.an2cn(num_str, "low")
-                except:
-                    return num_str
+        # 1. 单位符号：多字符走一趟交替正则，单字符走 translate
+        #    （原实现是 18 次 str.replace，每次都重扫全串）
+        text = _UNIT_RE.sub(lambda m: _UNIT_MAP[m.group(0)], text)
+        text = text.translate(_UNIT_TRANS)
+        text = _LONE_M_RE.sub(r'\1米', text)
 
-        text = re.sub(r'\d+', replace_long_number, text)
+        # 2. 数字转换：百分比/年份/小数/整数合并为一次扫描按组分派
+        #    （交替顺序保证 65.3% 先按百分比命中，2025年 先按年份命中）
+        text = _NUM_RE.sub(_num_dispatch, text)
 
         return text
 
@@ -235,44 +239,107 @@ class TTSProvider(TTSProviderBase):
         # 初始化TTS模型
         logger.bind(tag=TAG).info(f"正在加载sherpa-onnx-vits-zh-ll模型: {self.model_dir}")
         
+        # 优先把 number/date/phone 等 FST 规则交给 sherpa-onnx 原生执行：
+        # C++ 侧的 FST 组合比 Python 端多趟正则快得多，也更准确。
+        # 旧版本的 OfflineTtsVitsModelConfig 不支持 rule_fsts，失败时回退
+        # Python 端的 convert_numbers_to_chinese。
+        self._use_native_norm = False
+        rule_fst_str = ",".join(rule_fsts)
+
+        # 未显式配置 provider 时自动探测：ONNX Runtime 带 CUDA 时把
+        # 推理放到 GPU（VITS 解码器上 GPU 明显快于 CPU 多线程），
+        # 此时 intra-op 线程留 1 个即可，把 CPU 让给后处理
+        provider = config.get("provider")
+        num_threads = config.get("num_threads")
+        if provider is None:
+            provider = "cpu"
+            try:
+                import onnxruntime as ort
+                if "CUDAExecutionProvider" in ort.get_available_providers():
+                    provider = "cuda"
+            except ImportError:
+                pass
+        if num_threads is None:
+            num_threads = 1 if provider == "cuda" else 2
+        logger.bind(tag=TAG).info(f"sherpa-onnx推理后端: {provider}, 线程数: {num_threads}")
+
         try:
             with CaptureOutput():
-                # 构建OfflineTts配置
-                # 注意：当前版本的sherpa-onnx不支持rule_fsts属性，因此不设置FST规则文件
-                tts_config = sherpa_onnx.OfflineTtsConfig(
-                    model=sherpa_onnx.OfflineTtsModelConfig(
-                        vits=sherpa_onnx.OfflineTtsVitsModelConfig(
-                            model=model_file,
-                            lexicon=lexicon_file,
-                            tokens=tokens_file,
-                            dict_dir=dict_dir if dict_dir else "",
-                            data_dir="",  # 不使用data_dir
-                            length_scale=1.0,
-                            noise_scale=0.667,
-                            noise_scale_w=0.8,
-                        ),
-                        num_threads=config.get("num_threads", 2),
-                        debug=config.get("debug", False),
-                        provider=config.get("provider", "cpu"),  # cpu 或 cuda
-                    ),
-                    max_num_sentences=config.get("max_num_sentences", 2),
+                self.tts = self._build_tts(
+                    config, model_file, lexicon_file, tokens_file, dict_dir,
+                    provider, num_threads, rule_fsts=rule_fst_str,
                 )
-                
-                self.tts = sherpa_onnx.OfflineTts(tts_config)
-                
-                # 记录FST文件信息（仅用于日志，不实际使用）
-                if rule_fsts:
+                self._use_native_norm = bool(rule_fst_str)
+        except Exception:
+            self.tts = None
+
+        try:
+            if self.tts is None:
+                with CaptureOutput():
+                    self.tts = self._build_tts(
+                        config, model_file, lexicon_file, tokens_file, dict_dir,
+                        provider, num_threads, rule_fsts=None,
+                    )
+
+            if rule_fsts:
+                if self._use_native_norm:
+                    logger.bind(tag=TAG).info(
+                        f"已启用原生FST文本归一化: {', '.join(os.path.basename(f) for f in rule_fsts)}"
+                    )
+                else:
                     logger.bind(tag=TAG).debug(
-                        f"检测到FST规则文件: {', '.join(os.path.basename(f) for f in rule_fsts)}（当前版本不支持）"
+                        f"检测到FST规则文件但当前sherpa-onnx版本不支持rule_fsts，"
+                        f"回退Python数字转换: {', '.join(os.path.basename(f) for f in rule_fsts)}"
                     )
-                logger.bind(tag=TAG).info(
-                    f"sherpa-onnx-vits-zh-ll模型加载成功，说话人ID: {self.speaker_id}"
-                )
+            logger.bind(tag=TAG).info(
+                f"sherpa-onnx-vits-zh-ll模型加载成功，说话人ID: {self.speaker_id}"
+            )
         
         except Exception as e:
             logger.bind(tag=TAG).error(f"加载sherpa-onnx-vits-zh-ll模型失败: {e}")
             raise
-    
+
+        # 合成后处理复用的 float32 工作缓冲（约20秒@24kHz），按需扩容。
+        # 长时运行的服务里每次都新分配会持续制造大块临时数组，碎片化
+        # Python 分配器；复用一块常驻缓冲让分配规模稳定下来
+        self._pcm_buf = np.empty(24000 * 20, dtype=np.float32)
+
+        # 预热一次合成：CUDA 下首次推理包含内核编译与显存池分配，
+        # 提前付掉这笔开销，避免算进第一条用户语音的延迟
+        try:
+            with CaptureOutput():
+                self.tts.generate("你好", sid=self.speaker_id, speed=1.0)
+        except Exception as e:
+            logger.bind(tag=TAG).debug(f"预热合成失败（可忽略）: {e}")
+
+    @staticmethod
+    def _build_tts(config, model_file, lexicon_file, tokens_file, dict_dir,
+                   provider, num_threads, rule_fsts=None):
+        """构建 OfflineTts 实例；rule_fsts 为逗号连接的FST文件路径（可选）"""
+        vits_kwargs = dict(
+            model=model_file,
+            lexicon=lexicon_file,
+            tokens=tokens_file,
+            dict_dir=dict_dir if dict_dir else "",
+            data_dir="",  # 不使用data_dir
+            length_scale=1.0,
+            noise_scale=0.667,
+            noise_scale_w=0.8,
+        )
+        if rule_fsts:
+            vits_kwargs["rule_fsts"] = rule_fsts
+
+        tts_config = sherpa_onnx.OfflineTtsConfig(
+            model=sherpa_onnx.OfflineTtsModelConfig(
+                vits=sherpa_onnx.OfflineTtsVitsModelConfig(**vits_kwargs),
+                num_threads=num_threads,
+                debug=config.get("debug", False),
+                provider=provider,  # cpu 或 cuda
+            ),
+            max_num_sentences=config.get("max_num_sentences", 2),
+        )
+        return sherpa_onnx.OfflineTts(tts_config)
+
     async def text_to_speak(self, text, output_file):
         """
         将文本转换为语音
@@ -285,45 +352,42 @@ class TTSProvider(TTSProviderBase):
             如果output_file为None，返回音频字节数据；否则返回None
         """
         try:
-            # 将数字转换为中文
-            processed_text = convert_numbers_to_chinese(text)
-            if processed_text != text:
-                logger.bind(tag=TAG).info(f"数字转换: {text} -> {processed_text}")
+            # 将数字转换为中文；启用原生FST归一化时由模型内部处理
+            if self._use_native_norm:
+                processed_text = text
+            else:
+                processed_text = convert_numbers_to_chinese(text)
+                if processed_text != text:
+                    logger.bind(tag=TAG).info(f"数字转换: {text} -> {processed_text}")
 
             # 使用sherpa-onnx进行语音合成
             audio = self.tts.generate(processed_text, sid=self.speaker_id, speed=1.0)
             
-            # 获取音频数据
-            import numpy as np
-            
-            # audio.samples 可能是列表或numpy数组，统一转换为numpy数组
-            samples = audio.samples
-            if isinstance(samples, list):
-                samples = np.array(samples, dtype=np.float32)
-            else:
-                samples = np.asarray(samples, dtype=np.float32)
-            
+            # audio.samples 可能是列表或numpy数组；asarray 两种都能收，
+            # 已是 float32 数组时不产生拷贝。ravel 对连续数组返回视图
+            # （flatten 总是拷贝）
+            samples = np.asarray(audio.samples, dtype=np.float32)
+            if samples.ndim > 1:
+                samples = samples.ravel()
+
             sample_rate = audio.sample_rate  # 采样率
             
-            # 确保数据是一维数组
-            if len(samples.shape) > 1:
-                samples = samples.flatten()
-            
-            # 将[-1, 1]范围的float32转换为[-32768, 32767]范围的int16
-            # 使用clip确保值在有效范围内
-            samples_int16 = np.clip(samples * 32767, -32768, 32767).astype(np.int16)
-            
-            # 创建WAV格式的字节数据
-            wav_bytes = io.BytesIO()
-            with wave.open(wav_bytes, "wb") as wav_file:
-                wav_file.setnchannels(1)  # 单声道
-                wav_file.setsampwidth(2)  # 16位采样
-                wav_file.setframerate(sample_rate)
-                wav_file.writeframes(samples_int16.tobytes())
+            # 将[-1, 1]范围的float32转换为[-32768, 32767]范围的int16。
+            # 拷入常驻缓冲后就地 clip + 缩放：不再为每次合成分配新的
+            # float32 临时数组（这一步是内存带宽瓶颈，不是算力瓶颈）
+            n = samples.size
+            if n > self._pcm_buf.size:
+                self._pcm_buf = np.empty(n, dtype=np.float32)
+            view = self._pcm_buf[:n]
+            np.copyto(view, samples)
+            np.clip(view, -1.0, 1.0, out=view)
+            view *= 32767.0
+            samples_int16 = view.astype(np.int16)
             
-            # 获取WAV字节数据
-            wav_bytes.seek(0)  # 确保指针在开始位置
-            wav_data = wav_bytes.getvalue()
+            # 直接拼 44 字节 WAV 头 + PCM 数据，绕开 wave/BytesIO 的
+            # 两个中间缓冲（约 2 倍 PCM 大小的瞬时内存）
+            data = samples_int16.tobytes()
+            wav_data = _wav_header(len(data), sample_rate) + data
             
             # 保存到文件或返回字节数据
             if output_file:
@@ -13,6 +13,7 @@
 import os
 import sys
 import json
+import struct
 import hashlib
 import base64
 import platform
@@ -22,10 +23,17 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Tuple, Optional, Dict, Any
 from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import rsa, padding
+from cryptography.hazmat.primitives.asymmetric import rsa, padding, ed25519
 from cryptography.hazmat.backends import default_backend
 from cryptography.exceptions import InvalidSignature
 
+# orjson 为可选加速：bytes 原生进出，验签重建与解析少一次
+# encode/decode；其 dumps 输出与生成端的规范化 JSON 字节一致
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # 导入时间防篡改模块
 from core.time_validator import TimeValidator, validate_system_time
 
@@ -49,6 +57,28 @@ zwIDAQAB
 # 许可证文件名
 LICENSE_FILE = "license.lic"
 
+# 机器码缓存文件：Windows 上采集磁盘序列号要起 wmic 子进程
+# （数百毫秒），机器码本身不会变，跨进程缓存起来
+MACHINE_ID_FILE = ".machine_id"
+
+# 进程级机器码缓存：同一进程内多个 LicenseVerifier 实例共享
+_MACHINE_ID_CACHE = None
+
+# 公钥对象缓存：PUBLIC_KEY_PEM 是常量，PEM 解析 + ASN.1 解码只需
+# 做一次，所有验证器实例共享同一个 key 对象
+_PUBLIC_KEY_CACHE = None
+
+# 已验签的 license 数据缓存：license 文件在磁盘上不可变，按
+# (路径, mtime, size) 复用解析与验签结果，重复 verify() 只需一次
+# stat 加上时间相关检查，省掉每次的文件读取与 RSA 验签
+_VERIFIED_CACHE = {}
+
+# 二进制 license 封装的 magic（与 license_generator.py 保持一致）：
+# magic + u32 数据长度 + 签名原文 + 原始签名。
+# XZL1 的签名原文为规范化 JSON，XZL2 为 MessagePack
+LICENSE_MAGIC = b"XZL1"
+LICENSE_MAGIC_MSGPACK = b"XZL2"
+
 # 是否启用严格时间验证（检测到时间篡改时拒绝运行）
 STRICT_TIME_VALIDATION = True
 
@@ -87,22 +117,30 @@ class LicenseVerifier:
         self.license_file = self.license_dir / LICENSE_FILE
         self._machine_id = None
         self._public_key = None
+        # 旧格式 license 验签时重建的规范化字节缓存：license 数据在
+        # 一次运行内不变，序列化一次即可
+        self._sign_candidates = None
     
     def _get_public_key(self):
-        """加载公钥"""
+        """加载公钥（模块级缓存，实例间共享）"""
+        global _PUBLIC_KEY_CACHE
+
         if self._public_key:
             return self._public_key
-        
-        if "REPLACE_WITH_YOUR_PUBLIC_KEY" in PUBLIC_KEY_PEM:
-            raise LicenseError(
-                "公钥未配置！请先运行 license_generator.py 生成密钥对，"
-                "然后将公钥粘贴到 trial_license.py 的 PUBLIC_KEY_PEM 中"
+
+        if _PUBLIC_KEY_CACHE is None:
+            if "REPLACE_WITH_YOUR_PUBLIC_KEY" in PUBLIC_KEY_PEM:
+                raise LicenseError(
+                    "公钥未配置！请先运行 license_generator.py 生成密钥对，"
+                    "然后将公钥粘贴到 trial_license.py 的 PUBLIC_KEY_PEM 中"
+                )
+
+            _PUBLIC_KEY_CACHE = serialization.load_pem_public_key(
+                PUBLIC_KEY_PEM.encode(),
+                backend=default_backend()
             )
-        
-        self._public_key = serialization.load_pem_public_key(
-            PUBLIC_KEY_PEM.encode(),
-            backend=default_backend()
-        )
+
+        self._public_key = _PUBLIC_KEY_CACHE
         return self._public_key
     
     def get_machine_id(self) -> str:
@@ -110,9 +148,29 @@ class LicenseVerifier:
         获取机器唯一标识符
         组合多个硬件特征生成稳定的机器码
         """
+        global _MACHINE_ID_CACHE
+
         if self._machine_id:
             return self._machine_id
-        
+
+        if _MACHINE_ID_CACHE is not None:
+            self._machine_id = _MACHINE_ID_CACHE
+            return self._machine_id
+
+        # 跨进程缓存：哨兵值绑定主机名+架构，换机器时自动失效重算
+        sentinel = hashlib.sha256(
+            (platform.node() + platform.machine()).encode()
+        ).hexdigest()[:16]
+        cache_file = self.license_dir / MACHINE_ID_FILE
+        try:
+            cached_sentinel, _, cached_id = \
+                cache_file.read_text(encoding='utf-8').strip().partition(":")
+            if cached_sentinel == sentinel and len(cached_id) == 32:
+                self._machine_id = _MACHINE_ID_CACHE = cached_id
+                return cached_id
+        except (OSError, ValueError):
+            pass
+
         features = []
         
         # 1. 平台信息
@@ -135,50 +193,110 @@ class LicenseVerifier:
         # 5. 用户目录
         features.append(str(Path.home()))
         
-        # 6. 磁盘序列号（Windows）
+        # 6. 磁盘序列号（Windows）：GetVolumeInformationW 一次系统调用
+        # 即可拿到系统卷序列号，替代原先起 wmic 子进程再解析文本的
+        # 方案（进程创建 + 最长 5 秒等待，通常耗时数百毫秒）
         if platform.system() == 'Windows':
             try:
-                import subprocess
-                result = subprocess.run(
-                    ['wmic', 'diskdrive', 'get', 'serialnumber'],
-                    capture_output=True, text=True, timeout=5
+                import ctypes
+                serial = ctypes.c_ulong(0)
+                buf = ctypes.create_unicode_buffer(1024)
+                ok = ctypes.windll.kernel32.GetVolumeInformationW(
+                    'C:\\', buf, 1024, ctypes.byref(serial),
+                    None, None, None, 0
                 )
-                if result.returncode == 0:
-                    lines = [l.strip() for l in result.stdout.split('\n') if l.strip() and l.strip() != 'SerialNumber']
-                    if lines:
-                        features.append(lines[0])
+                if ok and serial.value:
+                    features.append(str(serial.value))
             except:
                 pass
         
         # 组合并哈希生成 32 字符机器码
         combined = "|".join(features)
-        self._machine_id = hashlib.sha256(combined.encode()).hexdigest()[:32]
-        
+        self._machine_id = _MACHINE_ID_CACHE = \
+            hashlib.sha256(combined.encode()).hexdigest()[:32]
+
+        # 写入跨进程缓存（失败不影响功能）
+        try:
+            cache_file.write_text(
+                f"{sentinel}:{self._machine_id}", encoding='utf-8'
+            )
+        except OSError:
+            pass
+
         return self._machine_id
     
-    def _verify_signature(self, data: dict, signature: str) -> bool:
-        """验证数字签名"""
-        public_key = self._get_public_key()
-        
-        # 重建签名数据
-        sign_data = json.dumps(data, sort_keys=True, ensure_ascii=False)
-        
-        try:
-            signature_bytes = base64.b64decode(signature)
+    def _verify_one(self, public_key, signature_bytes: bytes, payload: bytes):
+        """对单一字节串执行签名校验，算法按公钥类型分发"""
+        if isinstance(public_key, ed25519.Ed25519PublicKey):
+            # Ed25519 签名（生成端 sig_alg=ed25519），内部使用 SHA-512
+            public_key.verify(signature_bytes, payload)
+        else:
             public_key.verify(
                 signature_bytes,
-                sign_data.encode('utf-8'),
+                payload,
                 padding.PSS(
                     mgf=padding.MGF1(hashes.SHA256()),
                     salt_length=padding.PSS.MAX_LENGTH
                 ),
                 hashes.SHA256()
             )
-            return True
-        except InvalidSignature:
-            return False
+
+    def _verify_signature(self, data: dict, signature, payload: bytes = None) -> bool:
+        """验证数字签名
+
+        Args:
+            data: license 数据字典
+            signature: 签名（二进制格式为原始字节，旧格式为 base64 字符串）
+            payload: 二进制格式中随文件携带的签名原文，存在时直接校验，
+                     无需重建 JSON
+        """
+        public_key = self._get_public_key()
+
+        if payload is not None:
+            candidates = [payload]
+        elif self._sign_candidates is not None:
+            candidates = self._sign_candidates
+        else:
+            # 重建签名数据：新版生成器使用紧凑分隔符的规范化 JSON，
+            # 旧版 license 使用 stdlib 默认分隔符（带空格），两者都要尝试
+            if orjson is not None:
+                compact = orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+            else:
+                compact = json.dumps(data, sort_keys=True, ensure_ascii=False,
+                                     separators=(',', ':')).encode('utf-8')
+            candidates = [
+                compact,
+                json.dumps(data, sort_keys=True, ensure_ascii=False).encode('utf-8'),
+            ]
+            self._sign_candidates = candidates
+
+        try:
+            if isinstance(signature, str):
+                signature_bytes = base64.b64decode(signature)
+            else:
+                # bytes / memoryview 原样使用，验签接口接受 bytes-like
+                signature_bytes = signature
         except Exception as e:
             raise LicenseInvalid(f"签名验证失败: {e}")
+
+        # 快速拒绝：签名长度与密钥不符时必然无效，直接返回，
+        # 不必进入模幂/曲线运算（验签里最贵的一步）
+        if isinstance(public_key, ed25519.Ed25519PublicKey):
+            expected_len = 64
+        else:
+            expected_len = public_key.key_size // 8
+        if len(signature_bytes) != expected_len:
+            return False
+
+        for payload in candidates:
+            try:
+                self._verify_one(public_key, signature_bytes, payload)
+                return True
+            except InvalidSignature:
+                continue
+            except Exception as e:
+                raise LicenseInvalid(f"签名验证失败: {e}")
+        return False
     
     def _load_license(self) -> dict:
         """加载并解析 license 文件"""
@@ -189,15 +307,41 @@ class LicenseVerifier:
             )
         
         try:
-            with open(self.license_file, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-            
-            # 解码 base64
-            decoded = base64.b64decode(content).decode('utf-8')
-            license_data = json.loads(decoded)
-            
+            with open(self.license_file, 'rb') as f:
+                raw = f.read()
+
+            magic = raw[:4]
+            if magic in (LICENSE_MAGIC, LICENSE_MAGIC_MSGPACK):
+                # 二进制封装：签名原文随文件携带，验证时无需重建序列化。
+                # memoryview 切片是零拷贝视图，载荷与签名不再各复制一份，
+                # verify() 接受任意 bytes-like，可直接传入
+                (data_len,) = struct.unpack_from('<I', raw, 4)
+                mv = memoryview(raw)
+                payload = mv[8:8 + data_len]
+                if magic == LICENSE_MAGIC_MSGPACK:
+                    import ormsgpack
+                    data = ormsgpack.unpackb(payload)
+                elif orjson is not None:
+                    data = orjson.loads(payload)
+                else:
+                    data = json.loads(bytes(payload))
+                return {
+                    "data": data,
+                    "signature": mv[8 + data_len:],
+                    "payload": payload,
+                }
+
+            # 旧格式：base64(JSON) 文本。解析器可直接吃 bytes，
+            # 省去一次 str 解码再由解析器重新编码的往返
+            decoded = base64.b64decode(raw.strip())
+            if orjson is not None:
+                license_data = orjson.loads(decoded)
+            else:
+                license_data = json.loads(decoded)
+
             return license_data
-        except json.JSONDecodeError:
+        except ValueError:
+            # json.JSONDecodeError / orjson.JSONDecodeError 均为 ValueError 子类
             raise LicenseInvalid("许可证格式错误")
         except Exception as e:
             raise LicenseInvalid(f"无法读取许可证: {e}")
@@ -214,29 +358,44 @@ class LicenseVerifier:
             LicenseInvalid: 许可证无效
             LicenseExpired: 许可证已过期
         """
-        license_data = self._load_license()
-        
-        # 提取数据和签名
-        data = license_data.get("data", {})
-        signature = license_data.get("signature", "")
-        
-        if not data or not signature:
-            raise LicenseInvalid("许可证结构不完整")
-        
-        # 1. 验证签名
-        if not self._verify_signature(data, signature):
-            raise LicenseInvalid("许可证签名验证失败，可能被篡改")
-        
-        # 2. 验证机器码（如果 license 中指定了机器码）
-        license_machine_id = data.get("machine_id", "")
-        if license_machine_id and license_machine_id != "*":  # * 表示通用 license
-            if license_machine_id != self.get_machine_id():
-                raise LicenseInvalid(
-                    f"许可证与当前机器不匹配\n"
-                    f"许可证机器码: {license_machine_id[:8]}...\n"
-                    f"当前机器码:   {self.get_machine_id()[:8]}..."
-                )
-        
+        # 文件未变化时复用已验签的数据，只重做时间相关检查
+        cache_key = None
+        data = None
+        try:
+            st = os.stat(self.license_file)
+            cache_key = (str(self.license_file), st.st_mtime_ns, st.st_size)
+            data = _VERIFIED_CACHE.get(cache_key)
+        except OSError:
+            pass
+
+        if data is None:
+            license_data = self._load_license()
+
+            # 提取数据和签名
+            data = license_data.get("data", {})
+            signature = license_data.get("signature", "")
+
+            if not data or not signature:
+                raise LicenseInvalid("许可证结构不完整")
+
+            # 1. 验证签名
+            if not self._verify_signature(data, signature, license_data.get("payload")):
+                raise LicenseInvalid("许可证签名验证失败，可能被篡改")
+
+            # 2. 验证机器码（如果 license 中指定了机器码）
+            license_machine_id = data.get("machine_id", "")
+            if license_machine_id and license_machine_id != "*":  # * 表示通用 license
+                if license_machine_id != self.get_machine_id():
+                    raise LicenseInvalid(
+                        f"许可证与当前机器不匹配\n"
+                        f"许可证机器码: {license_machine_id[:8]}...\n"
+                        f"当前机器码:   {self.get_machine_id()[:8]}..."
+                    )
+
+            if cache_key is not None:
+                _VERIFIED_CACHE[cache_key] = data
+
+
         # 3. 多重时间防篡改检测
         time_validator = TimeValidator(
             state_dir=self.license_dir,
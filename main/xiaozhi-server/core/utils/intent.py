@@ -1,29 +1,46 @@
-import os
-import sys
-from config.logger import setup_logging
-import importlib
-
-logger = setup_logging()
-
-
-def get_base_path():
-    """获取基础路径，支持打包环境"""
-    if getattr(sys, 'frozen', False):
-        return sys._MEIPASS
-    else:
-        return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-
-def create_instance(class_name, *args, **kwargs):
-    # 创建intent实例
-    base_path = get_base_path()
-    provider_path = os.path.join(base_path, 'core', 'providers', 'intent', class_name, f'{class_name}.py')
-    dev_path = os.path.join('core', 'providers', 'intent', class_name, f'{class_name}.py')
-    
-    if os.path.exists(provider_path) or os.path.exists(dev_path):
-        lib_name = f'core.providers.intent.{class_name}.{class_name}'
-        if lib_name not in sys.modules:
-            sys.modules[lib_name] = importlib.import_module(f'{lib_name}')
-        return sys.modules[lib_name].IntentProvider(*args, **kwargs)
-
-    raise ValueError(f"不支持的intent类型: {class_name}，请检查该配置的type是否设置正确")
\ No newline at end of file
+import os
+import sys
+import functools
+from config.logger import setup_logging
+import importlib
+import importlib.util
+
+logger = setup_logging()
+
+
+@functools.lru_cache(maxsize=1)
+def get_base_path():
+    """获取基础路径，支持打包环境（结果进程内不变，缓存一次）"""
+    if getattr(sys, 'frozen', False):
+        return sys._MEIPASS
+    else:
+        return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# 已解析的 Provider 类注册表（class_name -> 类）
+_PROVIDERS: dict = {}
+
+
+def create_instance(class_name, *args, **kwargs):
+    # 创建intent实例
+    # 注册表直连：首次创建后 class_name 直接映射到 Provider 类，
+    # 热路径只剩一次字典查找，不再拼模块名、查 sys.modules
+    cls = _PROVIDERS.get(class_name)
+    if cls is not None:
+        return cls(*args, **kwargs)
+
+    lib_name = f'core.providers.intent.{class_name}.{class_name}'
+    mod = sys.modules.get(lib_name)
+    if mod is None:
+        # find_spec 走 Python 自身的 finder 缓存探测模块是否存在，
+        # 不再对源码路径做 stat（冻结打包与开发环境两套路径都覆盖）
+        try:
+            spec = importlib.util.find_spec(lib_name)
+        except ModuleNotFoundError:
+            spec = None
+        if spec is None:
+            raise ValueError(f'不支持的intent类型: {class_name}，请检查该配置的type是否设置正确')
+        mod = importlib.import_module(lib_name)
+
+    cls = _PROVIDERS[class_name] = mod.IntentProvider
+    return cls(*args, **kwargs)
@@ -1,39 +1,56 @@
-import os
-import sys
-
-# 添加项目根目录到Python路径
-current_dir = os.path.dirname(os.path.abspath(__file__))
-project_root = os.path.abspath(os.path.join(current_dir, "..", ".."))
-sys.path.insert(0, project_root)
-
-from config.logger import setup_logging
-import importlib
-
-logger = setup_logging()
-
-
-def get_base_path():
-    """获取基础路径，支持打包环境"""
-    if getattr(sys, 'frozen', False):
-        # PyInstaller 打包后
-        return sys._MEIPASS
-    else:
-        # 开发环境
-        return project_root
-
-
-def create_instance(class_name, *args, **kwargs):
-    # 创建VLLM实例
-    base_path = get_base_path()
-    provider_path = os.path.join(base_path, "core", "providers", "vllm", f"{class_name}.py")
-    
-    # 也检查开发环境路径
-    dev_path = os.path.join("core", "providers", "vllm", f"{class_name}.py")
-    
-    if os.path.exists(provider_path) or os.path.exists(dev_path):
-        lib_name = f"core.providers.vllm.{class_name}"
-        if lib_name not in sys.modules:
-            sys.modules[lib_name] = importlib.import_module(f"{lib_name}")
-        return sys.modules[lib_name].VLLMProvider(*args, **kwargs)
-
-    raise ValueError(f"不支持的VLLM类型: {class_name}，请检查该配置的type是否设置正确")
+import os
+import sys
+import functools
+
+# 添加项目根目录到Python路径（防止重复导入时反复插入同一条目，
+# 拖慢此后每一次 import 的路径搜索）
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "..", ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from config.logger import setup_logging
+import importlib
+import importlib.util
+
+logger = setup_logging()
+
+
+@functools.lru_cache(maxsize=1)
+def get_base_path():
+    """获取基础路径，支持打包环境（结果进程内不变，缓存一次）"""
+    if getattr(sys, 'frozen', False):
+        # PyInstaller 打包后
+        return sys._MEIPASS
+    else:
+        # 开发环境
+        return project_root
+
+
+# 已解析的 Provider 类注册表（class_name -> 类）
+_PROVIDERS: dict = {}
+
+
+def create_instance(class_name, *args, **kwargs):
+    # 创建VLLM实例
+    # 注册表直连：首次创建后 class_name 直接映射到 Provider 类，
+    # 热路径只剩一次字典查找，不再拼模块名、查 sys.modules
+    cls = _PROVIDERS.get(class_name)
+    if cls is not None:
+        return cls(*args, **kwargs)
+
+    lib_name = f"core.providers.vllm.{class_name}"
+    mod = sys.modules.get(lib_name)
+    if mod is None:
+        # find_spec 走 Python 自身的 finder 缓存探测模块是否存在，
+        # 不再对源码路径做 stat（冻结打包与开发环境两套路径都覆盖）
+        try:
+            spec = importlib.util.find_spec(lib_name)
+        except ModuleNotFoundError:
+            spec = None
+        if spec is None:
+            raise ValueError(f"不支持的VLLM类型: {class_name}，请检查该配置的type是否设置正确")
+        mod = importlib.import_module(lib_name)
+
+    cls = _PROVIDERS[class_name] = mod.VLLMProvider
+    return cls(*args, **kwargs)
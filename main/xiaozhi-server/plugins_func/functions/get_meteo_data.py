@@ -3,25 +3,39 @@
 用于查询本地气象监测设备的实时数据
 支持时间查询：昨天、今天、具体时间点等
 """
+import re
 import sqlite3
 import os
 import sys
+import time
+import functools
 import threading
 from datetime import datetime, timedelta
 from config.logger import setup_logging
 from plugins_func.register import register_function, ToolType, ActionResponse, Action
 
-# 尝试导入dateparser，如果没有则使用简单的时间解析
-try:
-    import dateparser
-    HAS_DATEPARSER = True
-except ImportError:
-    HAS_DATEPARSER = False
-    print("警告: 未安装dateparser库，时间解析功能受限。建议安装: pip install dateparser")
-
 TAG = __name__
 logger = setup_logging()
 
+# dateparser 只是正则快路径都没命中时的兜底，而 import dateparser
+# 本身要编译数百个正则、耗时约 300ms——推迟到第一次真正用到时再导入，
+# 常规查询路径不为它付出任何冷启动成本
+_dateparser = None  # None=未尝试导入, False=不可用, 模块对象=可用
+
+
+def _get_dateparser():
+    """懒加载 dateparser，导入结果（含失败）在进程内缓存"""
+    global _dateparser
+    if _dateparser is None:
+        try:
+            import dateparser
+            _dateparser = dateparser
+        except ImportError:
+            _dateparser = False
+            logger.bind(tag=TAG).warning(
+                "未安装dateparser库，时间解析功能受限。建议安装: pip install dateparser")
+    return _dateparser
+
 # 数据库路径 - 支持打包后的共享目录
 def get_db_path():
     """获取数据库路径，支持开发环境和打包环境"""
@@ -61,6 +75,10 @@ METEO_DICT = {
     "STEMB": {"name": "土壤温度", "unit": "℃"},
 }
 
+# 合法要素码集合：frozenset 成员测试路径最短，解析高频数据流时
+# 每组三元组都要查一次
+_VALID_CODES = frozenset(METEO_DICT)
+
 # 质控码说明
 QC_CODE = {
     0: "正常",
@@ -69,14 +87,81 @@ QC_CODE = {
     9: "缺测",
 }
 
+# 时间表达式的正则在模块加载时编译一次，
+# 解析函数里直接用已编译对象，匹配一次同时完成判断和捕获
+_DAYS_AGO_RE = re.compile(r'(\d+)\s*天前')
+_HOURS_AGO_RE = re.compile(r'(\d+)\s*小时前')
+_DATE_MD_RE = re.compile(r'(\d+)\s*月\s*(\d+)\s*[号日]?')
+_HOUR_RE = re.compile(r'(\d+)\s*[点时]')
+
+# 时间词表：基准日词 + 上周词 + 时间段词（时间段映射到默认小时）
+_TODAY_WORDS = ("今天", "今日", "现在", "当前")
+_YESTERDAY_WORDS = ("昨天", "昨日")
+_LASTWEEK_WORDS = ("上周", "上星期")
+_TIME_PERIOD_MAP = {
+    "凌晨": 4, "早上": 8, "早晨": 8, "上午": 10,
+    "中午": 12, "下午": 15, "傍晚": 18, "晚上": 20, "夜里": 22
+}
+_TIME_WORDS = (_TODAY_WORDS + _YESTERDAY_WORDS + ("前天",)
+               + _LASTWEEK_WORDS + tuple(_TIME_PERIOD_MAP))
+
+# 可选用 Aho-Corasick 自动机一趟扫完全部时间词，
+# 替代 ~18 次独立的子串扫描；未安装时回退逐词 in 测试
+try:
+    import ahocorasick
+    _TIME_AC = ahocorasick.Automaton()
+    for _word in _TIME_WORDS:
+        _TIME_AC.add_word(_word, _word)
+    _TIME_AC.make_automaton()
+except ImportError:
+    _TIME_AC = None
+
+
+def _scan_time_keywords(text: str) -> set:
+    """一趟扫描文本，返回命中的时间词集合"""
+    if _TIME_AC is not None:
+        return {word for _, word in _TIME_AC.iter(text)}
+    return {word for word in _TIME_WORDS if word in text}
+
 # 线程锁
 _db_lock = threading.Lock()
 
 
+def _connect() -> sqlite3.Connection:
+    """打开数据库连接并应用性能相关的 PRAGMA
+
+    - WAL：读写不互相阻塞，历史数据生成和查询可以并发
+    - synchronous=NORMAL：WAL 下只在检查点 fsync，写路径快数倍且不丢已提交事务
+    - busy_timeout：多线程抢锁时等待而不是直接抛 database is locked
+    - temp_store=MEMORY：排序等临时数据留在内存
+
+    journal_mode 持久化在数据库文件里，后续连接设置同值为空操作。
+    """
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+# 查询路径的线程本地连接：sqlite3 连接不能跨线程共享，
+# 每个线程懒打开一个并复用，省掉每次查询的 open+WAL 头解析开销
+_tls = threading.local()
+
+
+def _conn() -> sqlite3.Connection:
+    """获取当前线程的持久连接（懒创建）"""
+    conn = getattr(_tls, "conn", None)
+    if conn is None:
+        conn = _tls.conn = _connect()
+    return conn
+
+
 def init_database():
     """初始化数据库"""
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    with sqlite3.connect(DB_PATH) as conn:
+    with _connect() as conn:
         conn.execute("""
             CREATE TABLE IF NOT EXISTS meteo_data (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -84,11 +169,14 @@ def init_database():
                 element_code TEXT,
                 value REAL,
                 qc_code INTEGER,
-                obs_time TEXT,
+                obs_time INTEGER,
                 update_time TEXT
             )
         """)
         conn.execute("CREATE INDEX IF NOT EXISTS idx_element ON meteo_data(element_code)")
+        # 复合索引：按时间查询时 BETWEEN 走索引区间扫描，
+        # 不再全量扫描该要素的所有行
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_elem_time ON meteo_data(element_code, obs_time)")
         conn.commit()
 
 
@@ -99,60 +187,113 @@ def parse_meteo_string(data_string: str) -> dict:
         return {}
     
     station_id = parts[2]  # SH001
-    obs_time = parts[6]    # 20251125144200
-    
-    result = {"station_id": station_id, "obs_time": obs_time, "elements": {}}
-    
-    # 从第7个元素开始，每3个一组 [名称, 值, 质控码]
-    i = 7
-    while i + 2 < len(parts):
-        code = parts[i]
-        value = parts[i + 1]
-        qc = parts[i + 2]
-        
-        if code in METEO_DICT and value != "/" and value != "":
+    # 观测时间转成 unix 秒存储：入库后范围过滤是整数比较，
+    # 找最近值是一次减法，不再需要 SQL 层的字符串日期函数。
+    # 设备格式固定为 YYYYMMDDHHMMSS，直接切片比 strptime 的
+    # 格式串解释快一个数量级
+    ts = parts[6]  # 20251125144200
+    try:
+        obs_time = int(datetime(
+            int(ts[0:4]), int(ts[4:6]), int(ts[6:8]),
+            int(ts[8:10]), int(ts[10:12]), int(ts[12:14]),
+        ).timestamp())
+    except ValueError:
+        return {}
+
+    # 从第7个元素开始，每3个一组 [名称, 值, 质控码]。
+    # 三个切片一次取出所有列，zip 平铺迭代；要素值存为 (value, qc_code)
+    # 元组而不是小字典，每组少一次 dict 分配
+    elements = {}
+    for code, value, qc in zip(parts[7::3], parts[8::3], parts[9::3]):
+        if code in _VALID_CODES and value != "/" and value != "":
+            # 值和质控码的转换合在一个 try 里：任一字段非法就整组丢弃
             try:
-                result["elements"][code] = {
-                    "value": float(value),
-                    "qc_code": int(qc) if qc.isdigit() else 0
-                }
+                elements[code] = (float(value), int(qc))
             except ValueError:
                 pass
-        i += 3
-    
-    return result
+
+    return {"station_id": station_id, "obs_time": obs_time, "elements": elements}
 
 
 def save_meteo_data(data: dict):
     """保存气象数据到数据库"""
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    # 一个数据包的 ~8 个要素拼成一批，executemany 只解析/准备一次 SQL，
+    # with conn 的隐式事务负责提交
+    rows = [
+        (data["station_id"], code, value, qc_code, data["obs_time"], now)
+        for code, (value, qc_code) in data.get("elements", {}).items()
+    ]
+    if not rows:
+        return
     with _db_lock:
-        with sqlite3.connect(DB_PATH) as conn:
-            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            for code, elem in data.get("elements", {}).items():
-                # 使用 REPLACE 更新最新数据
-                conn.execute("""
-                    INSERT OR REPLACE INTO meteo_data 
-                    (station_id, element_code, value, qc_code, obs_time, update_time)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (data["station_id"], code, elem["value"], elem["qc_code"], 
-                      data["obs_time"], now))
-            conn.commit()
+        with _connect() as conn:
+            # 使用 REPLACE 更新最新数据
+            conn.executemany("""
+                INSERT OR REPLACE INTO meteo_data
+                (station_id, element_code, value, qc_code, obs_time, update_time)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, rows)
+    _bump_generation()
 
 
-def get_latest_element(element_code: str) -> dict:
-    """获取最新的某个气象要素数据"""
-    init_database()
+def save_meteo_data_bulk(rows: list):
+    """批量保存气象数据
+
+    Args:
+        rows: (station_id, element_code, value, qc_code, obs_time, update_time) 元组列表
+
+    整批数据在一个事务内用 executemany 写入：SQL 只解析一次，
+    fsync 只在提交时发生一次，比逐行 execute+commit 快一到两个数量级，
+    适合历史数据生成等大批量场景。
+    """
+    if not rows:
+        return
     with _db_lock:
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.execute("""
-                SELECT value, qc_code, obs_time, update_time
-                FROM meteo_data
-                WHERE element_code = ?
-                ORDER BY update_time DESC LIMIT 1
-            """, (element_code,))
-            row = cursor.fetchone()
-            if row:
-                return {"value": row[0], "qc_code": row[1], "obs_time": row[2], "update_time": row[3]}
+        with _connect() as conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO meteo_data
+                (station_id, element_code, value, qc_code, obs_time, update_time)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, rows)
+    _bump_generation()
+
+
+# 最新值的内存 TTL 缓存：连续问"现在温度"这类重复查询直接命中内存，
+# 设备每分钟才上报一次，15 秒内的值不会比数据库里的更旧多少。
+# 写入方每次落库会把 _data_generation 加一，缓存条目带着写入时的代数，
+# 代数不匹配立即失效——新数据到达后的第一次查询就能读到
+_LATEST_TTL = 15
+_latest_cache: dict = {}
+_data_generation = 0
+
+
+def _bump_generation():
+    """数据写入后调用，使最新值缓存立即失效"""
+    global _data_generation
+    _data_generation += 1
+
+
+def get_latest_element(element_code: str) -> dict:
+    """获取最新的某个气象要素数据（带 15 秒内存缓存，写入即失效）"""
+    cached = _latest_cache.get(element_code)
+    now = time.monotonic()
+    if (cached is not None and cached[2] == _data_generation
+            and now - cached[0] < _LATEST_TTL):
+        return cached[1]
+
+    # 数据库在模块导入时已初始化；WAL 下读不阻塞写，无需拿写锁
+    cursor = _conn().execute("""
+        SELECT value, qc_code, obs_time, update_time
+        FROM meteo_data
+        WHERE element_code = ?
+        ORDER BY update_time DESC LIMIT 1
+    """, (element_code,))
+    row = cursor.fetchone()
+    if row:
+        data = {"value": row[0], "qc_code": row[1], "obs_time": row[2], "update_time": row[3]}
+        _latest_cache[element_code] = (now, data, _data_generation)
+        return data
     return None
 
 
@@ -168,34 +309,29 @@ def get_element_by_time(element_code: str, target_time: datetime, tolerance_hour
     Returns:
         数据字典或None
     """
-    init_database()
-    with _db_lock:
-        with sqlite3.connect(DB_PATH) as conn:
-            # 计算时间范围
-            time_start = (target_time - timedelta(hours=tolerance_hours)).strftime("%Y-%m-%d %H:%M:%S")
-            time_end = (target_time + timedelta(hours=tolerance_hours)).strftime("%Y-%m-%d %H:%M:%S")
-            target_time_str = target_time.strftime("%Y-%m-%d %H:%M:%S")
-
-            # 查找时间范围内最接近的数据
-            cursor = conn.execute("""
-                SELECT value, qc_code, obs_time, update_time,
-                       ABS(JULIANDAY(obs_time) - JULIANDAY(?)) as time_diff
-                FROM meteo_data
-                WHERE element_code = ?
-                  AND obs_time BETWEEN ? AND ?
-                ORDER BY time_diff ASC
-                LIMIT 1
-            """, (target_time_str, element_code, time_start, time_end))
-
-            row = cursor.fetchone()
-            if row:
-                return {
-                    "value": row[0],
-                    "qc_code": row[1],
-                    "obs_time": row[2],
-                    "update_time": row[3],
-                    "time_diff_hours": row[4] * 24  # 转换为小时
-                }
+    # obs_time 是 unix 秒：BETWEEN 是整数区间（走 idx_elem_time 索引，
+    # 窗口内只剩几行），"最近"就是一次整数减法
+    target_ts = int(target_time.timestamp())
+    tolerance = tolerance_hours * 3600
+
+    row = _conn().execute("""
+        SELECT value, qc_code, obs_time, update_time,
+               ABS(obs_time - ?) as time_diff
+        FROM meteo_data
+        WHERE element_code = ?
+          AND obs_time BETWEEN ? AND ?
+        ORDER BY time_diff ASC
+        LIMIT 1
+    """, (target_ts, element_code, target_ts - tolerance, target_ts + tolerance)).fetchone()
+
+    if row:
+        return {
+            "value": row[0],
+            "qc_code": row[1],
+            "obs_time": row[2],
+            "update_time": row[3],
+            "time_diff_hours": row[4] / 3600  # 转换为小时
+        }
     return None
 
 
@@ -209,41 +345,39 @@ def parse_time_expression(text: str) -> datetime:
     Returns:
         解析出的datetime对象，如果解析失败返回None
     """
-    import re
-
     now = datetime.now()
     text = text.strip()
 
+    # 时间词一趟扫出来，后面都是集合成员测试
+    found = _scan_time_keywords(text)
+
     # 1. 提取基准日期（今天、昨天、前天、具体日期）
     base_date = None
 
     # 今天/现在
-    if "今天" in text or "今日" in text or "现在" in text or "当前" in text:
+    if not found.isdisjoint(_TODAY_WORDS):
         base_date = now
 
     # 昨天
-    elif "昨天" in text or "昨日" in text:
+    elif not found.isdisjoint(_YESTERDAY_WORDS):
         base_date = now - timedelta(days=1)
 
     # 前天
-    elif "前天" in text:
+    elif "前天" in found:
         base_date = now - timedelta(days=2)
 
     # N天前
-    elif re.search(r'(\d+)\s*天前', text):
-        match = re.search(r'(\d+)\s*天前', text)
+    elif (match := _DAYS_AGO_RE.search(text)):
         days = int(match.group(1))
         base_date = now - timedelta(days=days)
 
     # N小时前（直接返回）
-    elif re.search(r'(\d+)\s*小时前', text):
-        match = re.search(r'(\d+)\s*小时前', text)
+    elif (match := _HOURS_AGO_RE.search(text)):
         hours = int(match.group(1))
         return now - timedelta(hours=hours)
 
     # 具体日期：12月10号、12月10日、12-10
-    elif re.search(r'(\d+)\s*月\s*(\d+)\s*[号日]?', text):
-        match = re.search(r'(\d+)\s*月\s*(\d+)\s*[号日]?', text)
+    elif (match := _DATE_MD_RE.search(text)):
         month = int(match.group(1))
         day = int(match.group(2))
         year = now.year
@@ -256,7 +390,7 @@ def parse_time_expression(text: str) -> datetime:
             return None
 
     # 上周X
-    elif "上周" in text or "上星期" in text:
+    elif not found.isdisjoint(_LASTWEEK_WORDS):
         weekday_map = {"一": 0, "二": 1, "三": 2, "四": 3, "五": 4, "六": 5, "日": 6, "天": 6}
         for cn, num in weekday_map.items():
             if cn in text:
@@ -266,8 +400,8 @@ def parse_time_expression(text: str) -> datetime:
         if base_date is None:
             base_date = now - timedelta(days=7)
 
-    # 如果没有找到基准日期，尝试用dateparser
-    if base_date is None and HAS_DATEPARSER:
+    # 如果没有找到基准日期，尝试用dateparser（首次用到才导入）
+    if base_date is None and (dateparser := _get_dateparser()):
         parsed = dateparser.parse(
             text,
             languages=['zh'],
@@ -288,24 +422,18 @@ def parse_time_expression(text: str) -> datetime:
     hour = None
     minute = 0
 
-    # 时间段映射
-    time_period_map = {
-        "凌晨": 4, "早上": 8, "早晨": 8, "上午": 10,
-        "中午": 12, "下午": 15, "傍晚": 18, "晚上": 20, "夜里": 22
-    }
-
     # 先检查是否有具体小时数
     # 匹配：3点、15点、三点
-    hour_match = re.search(r'(\d+)\s*[点时]', text)
+    hour_match = _HOUR_RE.search(text)
     if hour_match:
         hour = int(hour_match.group(1))
         # 如果有"下午"且小时<12，需要+12
-        if ("下午" in text or "晚上" in text or "傍晚" in text) and hour < 12:
+        if hour < 12 and not found.isdisjoint(("下午", "晚上", "傍晚")):
             hour += 12
     else:
         # 没有具体小时，检查时间段
-        for period, default_hour in time_period_map.items():
-            if period in text:
+        for period, default_hour in _TIME_PERIOD_MAP.items():
+            if period in found:
                 hour = default_hour
                 break
 
@@ -357,6 +485,22 @@ USER_INPUT_MAP = {
     "紫外线": "UVRAA",
 }
 
+# 按关键词长度从长到短排序，优先匹配更具体的关键词
+_SORTED_INPUT_KEYS = sorted(USER_INPUT_MAP, key=len, reverse=True)
+
+
+@functools.lru_cache(maxsize=256)
+def _resolve_element(text: str):
+    """把用户输入映射到要素代码
+
+    LLM 的用词集中在很小的词表（"温度"、"湿度"……），lru_cache 让
+    重复输入变成一次字典查找，省掉每次的子串扫描。
+    """
+    return next(
+        (USER_INPUT_MAP[key] for key in _SORTED_INPUT_KEYS if key in text),
+        None,
+    )
+
 
 @register_function("get_meteo_data", GET_METEO_DATA_DESC, ToolType.SYSTEM_CTL)
 def get_meteo_data(conn, element: str, time_query: str = None):
@@ -368,15 +512,10 @@ def get_meteo_data(conn, element: str, time_query: str = None):
         element: 气象要素（温度、湿度等）
         time_query: 时间查询表达式（可选）
     """
-    # 将用户输入映射到要素代码
-    # 按关键词长度从长到短排序，优先匹配更具体的关键词
-    element_code = None
-    sorted_keys = sorted(USER_INPUT_MAP.keys(), key=len, reverse=True)
-    for key in sorted_keys:
-        if key in element:
-            element_code = USER_INPUT_MAP[key]
-            logger.bind(tag=TAG).info(f"匹配到要素: {key} -> {element_code}")
-            break
+    # 将用户输入映射到要素代码（带缓存）
+    element_code = _resolve_element(element)
+    if element_code:
+        logger.bind(tag=TAG).info(f"匹配到要素: {element} -> {element_code}")
 
     if not element_code:
         msg = "抱歉，不支持查询" + element + "，目前支持查询：温度、湿度、气压、风速、风向、降水量、能见度、紫外线"
@@ -407,7 +546,7 @@ def get_meteo_data(conn, element: str, time_query: str = None):
 
         # 构建回复（包含时间信息）
         qc_status = QC_CODE.get(data["qc_code"], "未知")
-        obs_time_obj = datetime.strptime(data["obs_time"], "%Y-%m-%d %H:%M:%S")
+        obs_time_obj = datetime.fromtimestamp(data["obs_time"])
         time_desc = obs_time_obj.strftime("%Y年%m月%d日 %H点")
 
         response = f"{time_desc}的{elem_info['name']}为 {data['value']} {elem_info['unit']}，数据状态：{qc_status}"
@@ -428,6 +567,8 @@ def get_meteo_data(conn, element: str, time_query: str = None):
     return ActionResponse(Action.RESPONSE, response, response)
 
 
-# 初始化数据库
-init_database()
+# 初始化数据库（模块级仅此一次；查询路径不再做 schema 检查）
+if not globals().get("_INITIALIZED"):
+    init_database()
+    _INITIALIZED = True
 
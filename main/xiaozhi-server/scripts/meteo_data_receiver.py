@@ -11,17 +11,40 @@ import sys
 import os
 import argparse
 import time
+from datetime import datetime
 
 # 添加项目路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
-from plugins_func.functions.get_meteo_data import parse_meteo_string, save_meteo_data, get_latest_element, init_database
+from plugins_func.functions.get_meteo_data import (
+    parse_meteo_string,
+    save_meteo_data,
+    save_meteo_data_bulk,
+    get_latest_element,
+    init_database,
+)
+
+# 串口接收的攒批参数：每 50 帧或 2 秒落一次盘，
+# 把每帧一次的事务/fsync 合并成一次批量 executemany
+_FLUSH_FRAMES = 50
+_FLUSH_SECONDS = 2.0
+
+# 测试模式用的示例帧：提到模块级只在导入时构建一次，
+# 反复调用 test_with_sample_data 不再重建 ~2KB 字符串字面量
+_SAMPLE_STR = """SH001DATADICK,V202401,SH001,YISMO00,N01,OB,20251125144200,ACRAA,669,0,ACRAB,1.30,0,ACRAA_mmmax,671,0,ACRAA_mmmin,666,0,ACRAA_mmstd,1.4318,0,TIMEC,202511251429,0,EVAPA,/,/,EVAPB,/,/,TEMPA,/,/,TEMPA_mmstd,/,/,TEMPA,/,/,TEMPA_mmstd,/,/,TEMPA,/,/,TEMPA_mmstd,/,/,TEMPA,12.5,0,TEMPA_mmstd,0.0580,0,HUMIA,/,/,HUMIA_mmstd,/,/,LERAA,397,0,LERAB,1.05,0,LERAA_mmmax,398,0,LERAA_mmmin,395,0,LERAA_mmstd,0.9214,0,TIMEC,202511251429,0,LSRAA,265,0,LSRAB,0.48,0,LSRAA_mmmax,266,0,LSRAA_mmmin,265,0,LSRAA_mmstd,0.4422,0,TIMEC,202511251429,0,PRECA,/,/,PRECA_p0accu,/,/,PRECA,0.0,0,PRECA_p0accu,0.0,0,PRECA,/,/,PRECA_p0accu,/,/,PRESA,/,/,PRESA_mmstd,/,/,SDRAA,601,0,SDRAB,1.11,0,SDRAA_mmmax,601,0,SDRAA_mmmin,600,0,SDRAA_mmstd,0.5000,0,TIMEC,202511251429,0,SGRAA,357,0,SGRAB,0.70,0,SGRAA_mmmax,358,0,SGRAA_mmmin,356,0,SGRAA_mmstd,0.7024,0,TIMEC,202511251429,0,SRRAA,106,0,SRRAB,0.20,0,SRRAA_mmmax,106,0,SRRAA_mmmin,106,0,SRRAA_mmstd,0.0000,0,TIMEC,202511251429,0,SSRAA,138,0,SSRAB,0.26,0,SSRAA_mmmax,139,0,SSRAA_mmmin,138,0,SSRAA_mmstd,0.4230,0,TIMEC,202511251429,0,STEMB,23.2,0,STEMB_mmstd,0.0441,0,STEMA,/,/,STEMB,/,/,STEMC,/,/,STEMD,/,/,STEME,/,/,STEMF,/,/,STEMG,/,/,STEMH,/,/,STEMI,/,/,STEMJ,/,/,UVRAA,16.17,0,UVRAE,0.032,0,UVRAA_mmmax,16.23,0,UVRAA_mmmin,16.11,0,UVRAA_mmstd,0.0342,0,TIMEC,202511251429,0,UVRAB,0.30,0,UVRAF,0.001,0,UVRAB_mmmax,0.30,0,UVRAB_mmmin,0.30,0,UVRAB_mmstd,0.0000,0,TIMEC,202511251429,0,VISIA,30000,0,VISIB,30000,0,WSPDA,/,/,WSPDB,/,/,WSPDC,/,/,WSPDD,/,/,WSPDE,/,/,WDIRA,/,/,WDIRB,/,/,WDIRC,/,/,WDIRD,/,/,WDIRE,/,/,WSPDA,3.0,0,WDIRA,253,0,WSPDB,3.2,0,WDIRB,240,0,WSPDC,3.0,0,WDIRC,231,0,WSPDD,2.9,0,WDIRD,241,0,WSPDE,3.9,0,WDIRE,240,0,TEMPB,13.6,0,WEATA,/,/,RDSDA,/,/,WEATA,00,9,SNOWA,/,/,PMPMA,/,/,PMPMB,/,/,PMPMC,/,/,PMPMD,/,/,CLODA,/,/,CLODC,/,/,CLODE,/,/,CLODF,/,/,CLODH,/,/,CLODI,/,/,CLODJ,/,/,z,0,6479,ED"""
+
+
+def _packet_rows(parsed, update_time):
+    """把一个解析后的数据包展平成批量插入用的元组列表"""
+    return [
+        (parsed["station_id"], code, value, qc_code,
+         parsed["obs_time"], update_time)
+        for code, (value, qc_code) in parsed["elements"].items()
+    ]
 
 
 def test_with_sample_data():
     """使用示例数据测试"""
-    sample_data = """SH001DATADICK,V202401,SH001,YISMO00,N01,OB,20251125144200,ACRAA,669,0,ACRAB,1.30,0,ACRAA_mmmax,671,0,ACRAA_mmmin,666,0,ACRAA_mmstd,1.4318,0,TIMEC,202511251429,0,EVAPA,/,/,EVAPB,/,/,TEMPA,/,/,TEMPA_mmstd,/,/,TEMPA,/,/,TEMPA_mmstd,/,/,TEMPA,/,/,TEMPA_mmstd,/,/,TEMPA,12.5,0,TEMPA_mmstd,0.0580,0,HUMIA,/,/,HUMIA_mmstd,/,/,LERAA,397,0,LERAB,1.05,0,LERAA_mmmax,398,0,LERAA_mmmin,395,0,LERAA_mmstd,0.9214,0,TIMEC,202511251429,0,LSRAA,265,0,LSRAB,0.48,0,LSRAA_mmmax,266,0,LSRAA_mmmin,265,0,LSRAA_mmstd,0.4422,0,TIMEC,202511251429,0,PRECA,/,/,PRECA_p0accu,/,/,PRECA,0.0,0,PRECA_p0accu,0.0,0,PRECA,/,/,PRECA_p0accu,/,/,PRESA,/,/,PRESA_mmstd,/,/,SDRAA,601,0,SDRAB,1.11,0,SDRAA_mmmax,601,0,SDRAA_mmmin,600,0,SDRAA_mmstd,0.5000,0,TIMEC,202511251429,0,SGRAA,357,0,SGRAB,0.70,0,SGRAA_mmmax,358,0,SGRAA_mmmin,356,0,SGRAA_mmstd,0.7024,0,TIMEC,202511251429,0,SRRAA,106,0,SRRAB,0.20,0,SRRAA_mmmax,106,0,SRRAA_mmmin,106,0,SRRAA_mmstd,0.0000,0,TIMEC,202511251429,0,SSRAA,138,0,SSRAB,0.26,0,SSRAA_mmmax,139,0,SSRAA_mmmin,138,0,SSRAA_mmstd,0.4230,0,TIMEC,202511251429,0,STEMB,23.2,0,STEMB_mmstd,0.0441,0,STEMA,/,/,STEMB,/,/,STEMC,/,/,STEMD,/,/,STEME,/,/,STEMF,/,/,STEMG,/,/,STEMH,/,/,STEMI,/,/,STEMJ,/,/,UVRAA,16.17,0,UVRAE,0.032,0,UVRAA_mmmax,16.23,0,UVRAA_mmmin,16.11,0,UVRAA_mmstd,0.0342,0,TIMEC,202511251429,0,UVRAB,0.30,0,UVRAF,0.001,0,UVRAB_mmmax,0.30,0,UVRAB_mmmin,0.30,0,UVRAB_mmstd,0.0000,0,TIMEC,202511251429,0,VISIA,30000,0,VISIB,30000,0,WSPDA,/,/,WSPDB,/,/,WSPDC,/,/,WSPDD,/,/,WSPDE,/,/,WDIRA,/,/,WDIRB,/,/,WDIRC,/,/,WDIRD,/,/,WDIRE,/,/,WSPDA,3.0,0,WDIRA,253,0,WSPDB,3.2,0,WDIRB,240,0,WSPDC,3.0,0,WDIRC,231,0,WSPDD,2.9,0,WDIRD,241,0,WSPDE,3.9,0,WDIRE,240,0,TEMPB,13.6,0,WEATA,/,/,RDSDA,/,/,WEATA,00,9,SNOWA,/,/,PMPMA,/,/,PMPMB,/,/,PMPMC,/,/,PMPMD,/,/,CLODA,/,/,CLODC,/,/,CLODE,/,/,CLODF,/,/,CLODH,/,/,CLODI,/,/,CLODJ,/,/,z,0,6479,ED"""
-    
     print("=" * 60)
     print("气象数据接收器 - 测试模式")
     print("=" * 60)
@@ -31,7 +54,7 @@ def test_with_sample_data():
     print("✓ 数据库初始化完成")
     
     # 解析数据
-    parsed = parse_meteo_string(sample_data)
+    parsed = parse_meteo_string(_SAMPLE_STR)
     print(f"✓ 解析完成，站点: {parsed.get('station_id')}, 观测时间: {parsed.get('obs_time')}")
     print(f"✓ 解析到 {len(parsed.get('elements', {}))} 个有效要素")
     
@@ -64,19 +87,43 @@ def receive_from_serial(port, baudrate=9600):
     print(f"正在监听串口 {port}，波特率 {baudrate}...")
     init_database()
     
+    # 解析出的行先攒在内存里，到帧数或时间阈值再整批写库：
+    # 瓶颈在每帧一次的提交/fsync，不在解析
+    pending_rows = []
+    pending_frames = 0
+    last_flush = time.monotonic()
+
+    def flush():
+        nonlocal pending_rows, pending_frames, last_flush
+        if pending_rows:
+            save_meteo_data_bulk(pending_rows)
+            print(f"[{time.strftime('%H:%M:%S')}] 已入库 {pending_frames} 帧 / {len(pending_rows)} 行")
+            pending_rows = []
+            pending_frames = 0
+        last_flush = time.monotonic()
+
     try:
         ser = serial.Serial(port, baudrate, timeout=1)
         while True:
-            line = ser.readline().decode('utf-8', errors='ignore').strip()
-            if line and line.startswith("SH"):
-                parsed = parse_meteo_string(line)
+            # 原始 bytes 上先按前缀过滤，噪声行不做 UTF-8 解码，
+            # 与文件回放路径保持同一套 bytes 管线
+            raw = ser.read_until(b'\n').strip()
+            if raw.startswith(b"SH"):
+                parsed = parse_meteo_string(raw.decode('utf-8', 'ignore'))
                 if parsed.get("elements"):
-                    save_meteo_data(parsed)
-                    print(f"[{time.strftime('%H:%M:%S')}] 收到数据，{len(parsed['elements'])} 个要素")
+                    update_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    pending_rows.extend(_packet_rows(parsed, update_time))
+                    pending_frames += 1
+            if (pending_frames >= _FLUSH_FRAMES
+                    or time.monotonic() - last_flush >= _FLUSH_SECONDS):
+                flush()
     except KeyboardInterrupt:
         print("\n已停止接收")
     except Exception as e:
         print(f"串口错误: {e}")
+    finally:
+        # 退出前把缓冲里的数据写完
+        flush()
 
 
 def receive_from_file(filepath):
@@ -88,11 +135,13 @@ def receive_from_file(filepath):
     init_database()
     print(f"从文件读取数据: {filepath}")
     
-    with open(filepath, 'r', encoding='utf-8') as f:
+    # 二进制模式 + 1MB 读缓冲：大回放文件少走很多次 read() 系统调用；
+    # 按 bytes 前缀先过滤，只有命中的行才做 UTF-8 解码
+    with open(filepath, 'rb', buffering=1024 * 1024) as f:
         for line in f:
             line = line.strip()
-            if line and line.startswith("SH"):
-                parsed = parse_meteo_string(line)
+            if line and line.startswith(b"SH"):
+                parsed = parse_meteo_string(line.decode('utf-8', 'ignore'))
                 if parsed.get("elements"):
                     save_meteo_data(parsed)
                     print(f"已处理: {parsed.get('station_id')} - {len(parsed['elements'])} 个要素")
@@ -9,6 +9,8 @@
 """
 import sys
 import os
+import io
+import atexit
 import random
 import math
 import time
@@ -36,44 +38,103 @@ def get_db_path():
 # 数据库路径
 DB_PATH = get_db_path()
 
+# 是否为 PyInstaller 打包环境（决定走简化存储还是主工程插件）
+_FROZEN = getattr(sys, 'frozen', False)
+
 
 # 判断是否打包环境，避免导入复杂依赖
-if getattr(sys, 'frozen', False):
+if _FROZEN:
     # 打包环境：使用简化版本，不依赖主项目模块
-    def save_meteo_data(data: dict):
+
+    # 模块级复用的数据库连接：每小时一次的小事务里，
+    # 连接建立的开销不输于写入本身
+    _db_conn = None
+
+    def _get_conn():
+        """获取（懒创建的）共享数据库连接，附带调优 PRAGMA"""
+        global _db_conn
+        if _db_conn is None:
+            # 加大语句缓存：相同 SQL 直接复用已编译的 VDBE 程序，
+            # 每小时的写入不再经过 SQL 解析
+            _db_conn = sqlite3.connect(DB_PATH, cached_statements=128)
+            # WAL 在 init_database 里设置且随库持久；这里是每连接参数：
+            # NORMAL 同步减少 fsync，临时表进内存，mmap/页缓存降低读开销
+            _db_conn.execute("PRAGMA synchronous=NORMAL")
+            _db_conn.execute("PRAGMA temp_store=MEMORY")
+            _db_conn.execute("PRAGMA mmap_size=268435456")
+            _db_conn.execute("PRAGMA cache_size=-20000")
+        return _db_conn
+
+    # 插入语句提为常量：语句缓存按 SQL 文本命中，常量保证各调用点
+    # 共享同一份编译结果
+    _INSERT_SQL = """
+        INSERT OR REPLACE INTO meteo_data
+        (station_id, obs_time, element_code, value, qc_code)
+        VALUES (?, ?, ?, ?, ?)
+    """
+
+    def save_meteo_data(data: dict, commit: bool = True):
         """保存气象数据到数据库（简化版）
-        
+
         Args:
             data: 包含以下字段的字典:
                 - station_id: 站点ID
                 - obs_time: 观测时间 (datetime 或字符串)
-                - elements: 气象要素字典，格式为 {element_code: {"value": ..., "qc_code": ...}}
+                - elements: 气象要素字典，格式为 {element_code: (value, qc_code)}
+            commit: 是否立即提交。批量补数时传 False，由调用方在
+                整个回填结束后一次性提交
         """
         station_id = data.get('station_id', 'LOCAL')
         obs_time = data.get('obs_time')
         elements = data.get('elements', {})
-        
-        # 如果是 datetime 对象，转换为字符串
-        if hasattr(obs_time, 'strftime'):
-            obs_time = obs_time.strftime('%Y-%m-%d %H:%M:%S')
-        
-        with sqlite3.connect(DB_PATH) as conn:
-            # 遍历每个气象要素并保存
-            for element_code, element_data in elements.items():
-                value = element_data.get('value')
-                qc_code = element_data.get('qc_code', 0)
-                
-                conn.execute("""
-                    INSERT OR REPLACE INTO meteo_data 
-                    (station_id, obs_time, element_code, value, qc_code) 
-                    VALUES (?, ?, ?, ?, ?)
-                """, (station_id, obs_time, element_code, value, qc_code))
+
+        # 如果是 datetime 对象，转换为字符串（isoformat 不走格式串解析，
+        # 整点时间输出与原 strftime 格式一致）
+        if hasattr(obs_time, 'isoformat'):
+            obs_time = obs_time.isoformat(' ')
+
+        # 一个时次的 8 个要素拼成一批：executemany 只准备一次 SQL，
+        # 整批一次提交，替代原来的逐要素 execute
+        rows = [
+            (station_id, obs_time, code, value, qc_code)
+            for code, (value, qc_code) in elements.items()
+        ]
+        if not rows:
+            return
+        conn = _get_conn()
+        conn.executemany(_INSERT_SQL, rows)
+        if commit:
             conn.commit()
-    
+
+    def save_meteo_data_batch(records: list):
+        """批量保存多个时次的数据，整批一个事务提交
+
+        Args:
+            records: generate_data_for_time 返回的数据字典列表
+        """
+        rows = []
+        for data in records:
+            obs_time = data.get('obs_time')
+            if hasattr(obs_time, 'isoformat'):
+                obs_time = obs_time.isoformat(' ')
+            station_id = data.get('station_id', 'LOCAL')
+            rows.extend(
+                (station_id, obs_time, code, value, qc_code)
+                for code, (value, qc_code) in data.get('elements', {}).items())
+        if not rows:
+            return
+        conn = _get_conn()
+        # 连接自身作上下文管理器：成功整批提交一次，异常回滚
+        with conn:
+            conn.executemany(_INSERT_SQL, rows)
+
     def init_database():
         """初始化数据库（简化版）"""
         os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
         with sqlite3.connect(DB_PATH) as conn:
+            # WAL 随数据库文件持久化，初始化时设一次即可：
+            # 写入不再阻塞读取，提交也不必重写回滚日志
+            conn.execute("PRAGMA journal_mode=WAL")
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS meteo_data (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -87,12 +148,48 @@ if getattr(sys, 'frozen', False):
                 )
             """)
             conn.execute("CREATE INDEX IF NOT EXISTS idx_obs_time ON meteo_data(obs_time)")
+            # 覆盖索引：最新时次的要素查询只读索引叶子页，
+            # 不用再回表取 value
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_obs_element "
+                "ON meteo_data(obs_time DESC, element_code, value)")
             conn.commit()
         print(f"✓ 数据库已初始化: {DB_PATH}")
 else:
     # 开发环境：添加项目路径并使用完整版本
     sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
-    from plugins_func.functions.get_meteo_data import save_meteo_data, init_database
+    from plugins_func.functions.get_meteo_data import (
+        save_meteo_data as _plugin_save_meteo_data,
+        save_meteo_data_bulk as _plugin_save_meteo_data_bulk,
+        init_database,
+    )
+
+    def save_meteo_data(data: dict, commit: bool = True):
+        """转换为主工程插件的契约后入库
+
+        插件侧 obs_time 存 unix 秒整数，这里把 datetime 转为
+        时间戳；要素的 (value, qc_code) 元组格式两边一致。
+        commit 参数仅为与简化版签名保持一致，插件内部每批自行提交。
+        """
+        obs_time = data.get("obs_time")
+        if hasattr(obs_time, "timestamp"):
+            data = dict(data, obs_time=int(obs_time.timestamp()))
+        _plugin_save_meteo_data(data)
+
+    def save_meteo_data_batch(records: list):
+        """批量入库多个时次：展平成插件的行元组，一个事务写入"""
+        update_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rows = []
+        for data in records:
+            obs_time = data.get("obs_time")
+            if hasattr(obs_time, "timestamp"):
+                obs_time = int(obs_time.timestamp())
+            station_id = data.get("station_id", "LOCAL")
+            rows.extend(
+                (station_id, code, value, qc_code, obs_time, update_time)
+                for code, (value, qc_code) in data.get("elements", {}).items())
+        if rows:
+            _plugin_save_meteo_data_bulk(rows)
 
 # 数据保留天数
 RETENTION_DAYS = 30
@@ -111,53 +208,49 @@ LOG_DIR = get_log_dir()
 LOG_FILE = os.path.join(LOG_DIR, "simulator.log")
 ERR_FILE = os.path.join(LOG_DIR, "simulator_err.log")
 
-# 全局日志文件句柄
-_log_file = None
-_err_file = None
-
-
 def setup_logging(daemon_mode=False):
     """设置日志输出"""
-    global _log_file, _err_file
-
     if daemon_mode:
-        # 守护进程模式：输出到文件
+        # 守护进程模式：输出到文件。底层 fd 不缓冲 + write_through，
+        # 每条日志直达内核页缓存，进程在回填中途崩溃也不丢缓冲行；
+        # 句柄直接挂在 sys.stdout/stderr 上，atexit 兜底关闭，
+        # 不再需要模块级句柄簿记
         os.makedirs(LOG_DIR, exist_ok=True)
-        _log_file = open(LOG_FILE, 'a', encoding='utf-8', buffering=1)  # 行缓冲
-        _err_file = open(ERR_FILE, 'a', encoding='utf-8', buffering=1)
-        sys.stdout = _log_file
-        sys.stderr = _err_file
+        sys.stdout = io.TextIOWrapper(
+            open(LOG_FILE, 'ab', buffering=0), encoding='utf-8', write_through=True)
+        sys.stderr = io.TextIOWrapper(
+            open(ERR_FILE, 'ab', buffering=0), encoding='utf-8', write_through=True)
+        atexit.register(sys.stdout.close)
+        atexit.register(sys.stderr.close)
     else:
         # 单次运行模式：输出到控制台
         if sys.platform == 'win32':
-            import io
             sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
             sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
 
 
-def cleanup_logging():
-    """清理日志文件句柄"""
-    global _log_file, _err_file
-    if _log_file:
-        _log_file.close()
-    if _err_file:
-        _err_file.close()
-
-
 def get_latest_data_time():
     """获取数据库中最新的数据时间"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.execute("""
-                SELECT obs_time 
-                FROM meteo_data 
-                WHERE obs_time LIKE '____-__-__ __:__:__'
-                ORDER BY obs_time DESC 
-                LIMIT 1
-            """)
+        # 打包环境复用共享连接：单事务回填期间能读到未提交的数据
+        conn = _get_conn() if _FROZEN else sqlite3.connect(DB_PATH)
+        try:
+            # MAX(obs_time) 是一次 O(1) 的索引最右查找；原来的 LIKE
+            # 谓词让优化器只能倒序逐项校验。写入格式由本程序保证，
+            # 无需再过滤
+            cursor = conn.execute("SELECT MAX(obs_time) FROM meteo_data")
             result = cursor.fetchone()
-            if result:
-                return datetime.strptime(result[0], "%Y-%m-%d %H:%M:%S")
+            value = result[0] if result else None
+            if value is not None:
+                # 开发环境的主工程库存 unix 秒整数，打包环境存文本
+                if isinstance(value, (int, float)):
+                    return datetime.fromtimestamp(value)
+                # fromisoformat 是 C 实现的快速路径（接受空格分隔符），
+                # 比每次解析格式串的 strptime 快一个数量级
+                return datetime.fromisoformat(value)
+        finally:
+            if not _FROZEN:
+                conn.close()
     except Exception as e:
         print(f"⚠️  获取最新数据时间失败: {e}")
     return None
@@ -166,22 +259,35 @@ def get_latest_data_time():
 def get_previous_hour_data():
     """获取上一小时的数据（用于连续变化）"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        conn = _get_conn() if _FROZEN else sqlite3.connect(DB_PATH)
+        try:
+            # 先用子查询做一次索引最右查找定位最新时次，再精确取该
+            # 时次的全部要素，替代 LIMIT 8 的倒序扫描——后者在整点
+            # 边界还可能跨两个时次取错数据
             cursor = conn.execute("""
                 SELECT element_code, value
-                FROM meteo_data 
-                WHERE obs_time LIKE '____-__-__ __:__:__'
-                ORDER BY obs_time DESC 
-                LIMIT 8
+                FROM meteo_data
+                WHERE obs_time = (SELECT MAX(obs_time) FROM meteo_data)
             """)
             results = cursor.fetchall()
             if results:
                 return {code: value for code, value in results}
+        finally:
+            if not _FROZEN:
+                conn.close()
     except Exception as e:
         print(f"⚠️  获取上一小时数据失败: {e}")
     return None
 
 
+# 昼夜正弦项的 24 小时查表：hour 只有 0-23 种取值，导入时算好，
+# 生成循环里把 math.sin 与相位运算换成一次下标访问
+# （打包环境不引 numpy，普通元组即可）
+_TEMP_SIN = tuple(8 * math.sin((h - 5) / 24 * 2 * math.pi) for h in range(24))
+_HUMI_SIN = tuple(-15 * math.sin((h - 6) / 24 * 2 * math.pi) for h in range(24))
+_UV_SIN = tuple(20 * math.sin((h - 6) / 12 * math.pi) for h in range(24))
+
+
 def simulate_temperature(hour, previous_temp=None, base_temp=15):
     """
     模拟温度
@@ -201,10 +307,8 @@ def simulate_temperature(hour, previous_temp=None, base_temp=15):
         return round(max(0, min(40, new_temp)), 1)  # 限制在0-40度
     else:
         # 首次运行，使用正弦波模拟昼夜变化
-        phase = (hour - 5) / 24 * 2 * math.pi
-        variation = 8 * math.sin(phase)
         noise = random.uniform(-2, 2)
-        return round(base_temp + variation + noise, 1)
+        return round(base_temp + _TEMP_SIN[hour] + noise, 1)
 
 
 def simulate_humidity(hour, previous_humidity=None):
@@ -214,11 +318,8 @@ def simulate_humidity(hour, previous_humidity=None):
         new_humidity = previous_humidity + change
         return round(max(30, min(95, new_humidity)), 1)
     else:
-        phase = (hour - 6) / 24 * 2 * math.pi
-        variation = -15 * math.sin(phase)
-        base = 60
         noise = random.uniform(-5, 5)
-        humidity = base + variation + noise
+        humidity = 60 + _HUMI_SIN[hour] + noise
         return round(max(30, min(95, humidity)), 1)
 
 
@@ -282,10 +383,8 @@ def simulate_uv_index(hour):
     if hour < 6 or hour > 18:
         return 0.0
     else:
-        phase = (hour - 6) / 12 * math.pi
-        intensity = 20 * math.sin(phase)
         noise = random.uniform(-2, 2)
-        return round(max(0, intensity + noise), 2)
+        return round(max(0, _UV_SIN[hour] + noise), 2)
 
 
 def generate_data_for_time(obs_time, previous_data=None):
@@ -308,18 +407,20 @@ def generate_data_for_time(obs_time, previous_data=None):
     prev_wind = previous_data.get("WSPDA") if previous_data else None
     prev_direction = previous_data.get("WDIRA") if previous_data else None
 
+    # obs_time 保留 datetime，由各自的保存路径决定落库格式；
+    # 要素值为 (value, qc_code) 元组，与主工程插件的约定一致
     return {
         "station_id": "SH001",
-        "obs_time": obs_time.strftime("%Y-%m-%d %H:%M:%S"),
+        "obs_time": obs_time,
         "elements": {
-            "TEMPA": {"value": simulate_temperature(hour, prev_temp), "qc_code": 0},
-            "HUMIA": {"value": simulate_humidity(hour, prev_humidity), "qc_code": 0},
-            "PRESA": {"value": simulate_pressure(prev_pressure), "qc_code": 0},
-            "WSPDA": {"value": simulate_wind_speed(hour, prev_wind), "qc_code": 0},
-            "WDIRA": {"value": simulate_wind_direction(prev_direction), "qc_code": 0},
-            "PRECA": {"value": simulate_precipitation(hour), "qc_code": 0},
-            "VISIA": {"value": simulate_visibility(), "qc_code": 0},
-            "UVRAA": {"value": simulate_uv_index(hour), "qc_code": 0},
+            "TEMPA": (simulate_temperature(hour, prev_temp), 0),
+            "HUMIA": (simulate_humidity(hour, prev_humidity), 0),
+            "PRESA": (simulate_pressure(prev_pressure), 0),
+            "WSPDA": (simulate_wind_speed(hour, prev_wind), 0),
+            "WDIRA": (simulate_wind_direction(prev_direction), 0),
+            "PRECA": (simulate_precipitation(hour), 0),
+            "VISIA": (simulate_visibility(), 0),
+            "UVRAA": (simulate_uv_index(hour), 0),
         }
     }
 
@@ -337,20 +438,32 @@ def fill_missing_data(start_time, end_time):
     current_time = start_time + timedelta(hours=1)
     count = 0
 
-    while current_time <= end_time:
-        # 获取上一小时数据（用于连续变化）
-        previous_data = get_previous_hour_data()
+    # 上一小时数据只在进入循环前查一次，之后在内存里随生成结果滚动：
+    # 刚生成的小时就是下一小时的基准，不必每小时再扫一遍数据库
+    # （逐小时查询会让回填退化成 O(N²)）
+    previous_data = get_previous_hour_data()
 
-        # 生成数据
+    # 按 24 小时攒一批整事务写入：每天一次提交（一天约 200 行，
+    # 内存占用有界），两种环境走同一条批量路径
+    pending = []
+
+    while current_time <= end_time:
+        # 生成数据（基于上一小时的内存快照连续变化）
         data = generate_data_for_time(current_time, previous_data)
-        save_meteo_data(data)
+        pending.append(data)
+        previous_data = {code: value for code, (value, _qc) in data["elements"].items()}
 
         count += 1
-        if count % 24 == 0:
+        if len(pending) >= 24:
+            save_meteo_data_batch(pending)
+            pending = []
             print(f"  ✓ 已补全 {count} 小时数据（当前：{current_time.strftime('%Y-%m-%d %H:%M')}）")
 
         current_time += timedelta(hours=1)
 
+    if pending:
+        save_meteo_data_batch(pending)
+
     print(f"✅ 补全完成！共补全 {count} 小时数据\n")
     return count
 
@@ -363,19 +476,27 @@ def cleanup_old_data(days=RETENTION_DAYS):
         days: 保留天数
     """
     cutoff_time = datetime.now() - timedelta(days=days)
-    cutoff_str = cutoff_time.strftime("%Y-%m-%d %H:%M:%S")
+    # 按各自库的 obs_time 类型绑定截止值：打包库存文本，开发环境的
+    # 主工程库存 unix 秒。SQLite 里整数恒小于文本，跨类型比较会把
+    # 整库删光，所以不能共用一个文本截止值
+    if _FROZEN:
+        cutoff = cutoff_time.isoformat(' ')
+    else:
+        cutoff = int(cutoff_time.timestamp())
 
     try:
         with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.execute("""
-                DELETE FROM meteo_data
-                WHERE obs_time < ? AND obs_time LIKE '____-__-__ __:__:__'
-            """, (cutoff_str,))
+            # 去掉 LIKE 谓词后是纯索引范围删除；写入格式由本程序保证
+            cursor = conn.execute(
+                "DELETE FROM meteo_data WHERE obs_time < ?", (cutoff,))
             deleted = cursor.rowcount
 
             if deleted > 0:
                 print(f"🗑️  清理旧数据：删除 {deleted} 条记录（{days}天前的数据）")
 
+            # 每日清理顺带截断 WAL，防止日志文件无限增长
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
             return deleted
     except Exception as e:
         print(f"⚠️  清理旧数据失败: {e}")
@@ -469,37 +590,30 @@ def run_daemon():
     print("🔄 进入循环模式，等待下一个整点...")
     print("=" * 60 + "\n")
 
+    # 本地时区相对 UTC 为整小时偏移（部署环境为 Asia/Shanghai），
+    # 整点时间戳可以直接用 epoch 秒整除得到
     try:
         while True:
-            now = datetime.now()
-            current_hour = now.replace(minute=0, second=0, microsecond=0)
-            next_hour = current_hour + timedelta(hours=1)
-
-            # 计算距离下一个整点的秒数
-            seconds_until_next_hour = (next_hour - now).total_seconds()
-
-            # 如果已经过了当前整点，立即生成数据
-            if seconds_until_next_hour > 3600:
-                print(f"⏰ [{now.strftime('%H:%M:%S')}] 生成当前整点数据...")
-                generate_current_hour_data()
-                cleanup_old_data(RETENTION_DAYS)
-
-                # 重新计算等待时间
-                now = datetime.now()
-                current_hour = now.replace(minute=0, second=0, microsecond=0)
-                next_hour = current_hour + timedelta(hours=1)
-                seconds_until_next_hour = (next_hour - now).total_seconds()
+            # 纯 epoch 算术：每轮不再构造 datetime/timedelta 对象，
+            # 展示用的 datetime 只在拼日志字符串时建一次
+            t = time.time()
+            next_hour_ts = (int(t) // 3600 + 1) * 3600
+            seconds_until_next_hour = next_hour_ts - t
 
             # 显示等待信息
+            now_str = time.strftime('%H:%M:%S', time.localtime(t))
+            next_str = time.strftime('%H:%M', time.localtime(next_hour_ts))
             wait_minutes = int(seconds_until_next_hour / 60)
-            print(f"⏳ [{now.strftime('%H:%M:%S')}] 等待下一个整点（{next_hour.strftime('%H:%M')}），还需 {wait_minutes} 分钟...")
+            print(f"⏳ [{now_str}] 等待下一个整点（{next_str}），还需 {wait_minutes} 分钟...")
 
-            # 等待到下一个整点（提前5秒唤醒，避免错过）
-            time.sleep(max(1, seconds_until_next_hour - 5))
+            # 一次睡到整点：按精确剩余秒数 sleep，替代原来提前 5 秒
+            # 唤醒后每秒轮询 datetime.now() 的 60 次唤醒风暴
+            time.sleep(max(0, seconds_until_next_hour))
 
-            # 等待到整点
-            while datetime.now().minute != 0:
-                time.sleep(1)
+            # sleep 可能因时钟调整早醒，补睡残差（通常为 0）
+            remaining = next_hour_ts - time.time()
+            if remaining > 0:
+                time.sleep(remaining)
 
             # 生成数据
             print(f"\n⏰ [{datetime.now().strftime('%H:%M:%S')}] 整点到达，开始生成数据...")
@@ -515,8 +629,6 @@ def run_daemon():
         print("\n\n" + "=" * 60)
         print("⏹️  程序已停止")
         print("=" * 60)
-    finally:
-        cleanup_logging()
 
 
 def main():
@@ -11,8 +11,15 @@ from plugins_func.functions.get_meteo_data import (
     init_database, parse_meteo_string, save_meteo_data, get_latest_element, METEO_DICT, QC_CODE
 )
 
+# 要素元数据索引：一次 get 拿到 (名称, 单位)，循环里不再为未收录
+# 的要素反复构造空字典兜底
+_META = {
+    code: (info.get("name", code), info.get("unit", ""))
+    for code, info in METEO_DICT.items()
+}
+
 # 测试数据（你提供的样本数据）
-test_data_string = "SH001DATADICK,V202401,SH001,YISMO00,N01,OB,20251125144200,ACRAA,669,0,ACRAB,1.30,0,ACRAA_mmmax,671,0,ACRAA_mmmin,666,0,ACRAA_mmstd,1.4318,0,TIMEC,202511251429,0,EVAPA,/,/,EVAPB,/,/,TEMPA,12.5,0,TEMPA_mmstd,0.0580,0,HUMIA,45,0,PRESA,1013.2,0,WSPDA,3.5,0,WDIRA,180,0"
+test_data_string ="SH001DATADICK,V202401,SH001,YISMO00,N01,OB,20251125144200,ACRAA,669,0,ACRAB,1.30,0,ACRAA_mmmax,671,0,ACRAA_mmmin,666,0,ACRAA_mmstd,1.4318,0,TIMEC,202511251429,0,EVAPA,/,/,EVAPB,/,/,TEMPA,12.5,0,TEMPA_mmstd,0.0580,0,HUMIA,45,0,PRESA,1013.2,0,WSPDA,3.5,0,WDIRA,180,0"
 
 def main():
     print("=" * 50)
@@ -30,11 +37,10 @@ def main():
     print(f"   站点ID: {parsed.get('station_id')}")
     print(f"   观测时间: {parsed.get('obs_time')}")
     print(f"   解析到 {len(parsed.get('elements', {}))} 个气象要素:")
-    for code, elem in parsed.get("elements", {}).items():
-        name = METEO_DICT.get(code, {}).get("name", code)
-        unit = METEO_DICT.get(code, {}).get("unit", "")
-        qc = QC_CODE.get(elem["qc_code"], "未知")
-        print(f"      - {name}({code}): {elem['value']} {unit}, 质控: {qc}")
+    for code, (value, qc_code) in parsed.get("elements", {}).items():
+        name, unit = _META.get(code, (code, ""))
+        qc = QC_CODE.get(qc_code, "未知")
+        print(f"      - {name}({code}): {value} {unit}, 质控: {qc}")
     
     # 保存到数据库
     print("\n3. 保存到数据库...")
@@ -46,8 +52,7 @@ def main():
     for code in ["TEMPA", "HUMIA", "PRESA", "WSPDA", "WDIRA"]:
         result = get_latest_element(code)
         if result:
-            name = METEO_DICT.get(code, {}).get("name", code)
-            unit = METEO_DICT.get(code, {}).get("unit", "")
+            name, unit = _META.get(code, (code, ""))
             qc = QC_CODE.get(result["qc_code"], "未知")
             print(f"   ✓ {name}: {result['value']} {unit}, 状态: {qc}")
         else:
@@ -0,0 +1,26 @@
+"""
+PyInstaller 运行时钩子：并行预热重量级依赖的导入
+
+torch/funasr/transformers 等包的导入大头在 C 扩展 .so 的 mmap 与
+重定位，期间释放 GIL，多线程预热可以相互重叠，明显缩短打包版
+EXE 的冷启动。导入失败（包未打进当前发行版）静默跳过，由业务
+代码按各自的可选依赖逻辑处理。
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+_HEAVY_PACKAGES = ["numpy", "torch", "funasr", "transformers"]
+
+
+def _warm(name):
+    try:
+        __import__(name)
+    except Exception:
+        pass
+
+
+_executor = ThreadPoolExecutor(max_workers=4)
+for _name in _HEAVY_PACKAGES:
+    _executor.submit(_warm, _name)
+# 不等待完成：主程序自身的导入会在 import lock 上自然汇合
+_executor.shutdown(wait=False)